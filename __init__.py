@@ -16,9 +16,10 @@ if "bpy" in locals():
     importlib.reload(mesh_tools)
     importlib.reload(vg_tools)
     importlib.reload(outline_tools)
+    importlib.reload(viewport_tools)
     importlib.reload(ui)
 else:
-    from . import mirror_tools, pose_tools, mesh_tools, vg_tools, outline_tools, ui
+    from . import mirror_tools, pose_tools, mesh_tools, vg_tools, outline_tools, viewport_tools, ui
 
 import bpy 
 
@@ -29,6 +30,7 @@ def register():
     mesh_tools.register()
     vg_tools.register()
     outline_tools.register()
+    viewport_tools.register()
     ui.register()
 
     #print('INFO: ' + bl_info['name'] + ' ' + common.get_current_version_str() + ' is registered!')
@@ -41,6 +43,7 @@ def unregister():
     mesh_tools.unregister()
     vg_tools.unregister()
     outline_tools.unregister()
+    viewport_tools.unregister()
     ui.unregister()
 
     #print('INFO: ' + bl_info['name'] + ' ' + common.get_current_version_str() + ' is unregistered!')
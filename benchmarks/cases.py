@@ -0,0 +1,292 @@
+# Benchmark cases for every operator registered by the addon
+# Each setup builds a scene from the parameters, sets the context and returns operator arguments
+
+import bpy, os, tempfile
+from scenes import *
+
+def get_temp_filepath(filename):
+    return os.path.join(tempfile.gettempdir(), 'yetc_benchmark_' + filename)
+
+def setup_union_meshes(p, spacing=0.8):
+    objs = []
+    for i in range(p['objects']):
+        objs.append(new_sphere_object('Sphere.%03d' % i, p['verts'], location=(i * spacing, 0, 0)))
+    for o in objs: o.select_set(True)
+    bpy.context.view_layer.objects.active = objs[0]
+    return {'ignore_non_manifold' : True, 'use_collection_operand' : True, 'solver' : 'EXACT'}
+
+def setup_union_meshes_scattered(p):
+    # Only every other pair overlaps
+    kwargs = setup_union_meshes(p, spacing=1.5)
+    kwargs['use_broad_phase'] = True
+    return kwargs
+
+def setup_union_meshes_one_by_one(p):
+    kwargs = setup_union_meshes(p)
+    kwargs['use_collection_operand'] = False
+    return kwargs
+
+def setup_shape_key_mesh(p):
+    obj = new_grid_object('Grid', p['verts'])
+    add_shape_keys(obj, p['shape_keys'])
+    return obj
+
+def setup_shape_key_reset(p):
+    obj = setup_shape_key_mesh(p)
+
+    # Reset from basis affects all shape keys
+    obj.active_shape_key_index = 0
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_all(action='SELECT')
+    return {}
+
+def setup_apply_shape_key(p):
+    setup_shape_key_mesh(p)
+    return {'delete_original' : False, 'use_current_value' : True}
+
+def setup_shape_key_to_attribute(p):
+    obj = setup_shape_key_mesh(p)
+    return {'my_collection' : [{'name' : kb.name, 'checked' : True} for kb in obj.data.shape_keys.key_blocks[1:]]}
+
+def setup_attribute_to_shape_key(p):
+    bpy.ops.mesh.y_shape_key_to_attribute(**setup_shape_key_to_attribute(p))
+    return {}
+
+def get_shape_key_collection(obj):
+    return [{'name' : kb.name, 'checked' : True} for kb in obj.data.shape_keys.key_blocks[1:]]
+
+def setup_mirror_shape_keys(p):
+    obj = setup_shape_key_mesh(p)
+    return {'my_collection' : get_shape_key_collection(obj), 'mode' : 'MIRROR'}
+
+def setup_split_shape_keys(p):
+    obj = setup_shape_key_mesh(p)
+    return {'my_collection' : get_shape_key_collection(obj), 'mode' : 'SIDE', 'falloff_width' : 0.2}
+
+def setup_corrective_shape_key(p):
+    obj, rig = setup_rigged_mesh(p)
+    new_grid_object('Sculpt', p['verts'])
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    return {}
+
+def setup_transfer_shape_keys(p):
+    source = setup_shape_key_mesh(p)
+    new_grid_object('Target', int(p['verts'] * 1.5))
+    source.select_set(True)
+    return {}
+
+def setup_export_shape_key_archive(p):
+    setup_shape_key_mesh(p)
+    return {'filepath' : get_temp_filepath('archive.npz')}
+
+def setup_import_shape_key_archive(p):
+    kwargs = setup_export_shape_key_archive(p)
+    bpy.ops.mesh.y_export_shape_key_archive(**kwargs)
+    return kwargs
+
+def setup_export_quantized_morphs(p):
+    setup_shape_key_mesh(p)
+    return {'filepath' : get_temp_filepath('morphs.npz')}
+
+def setup_modifier_stack_objects(p):
+    for i in range(p['objects']):
+        obj = new_grid_object('Grid.%03d' % i, p['verts'], location=(i * 2.5, 0, 0))
+        add_modifier_stack(obj, p['mod_depth'], subsurf_first=True)
+
+def setup_profile_evaluation_cost(p):
+    setup_modifier_stack_objects(p)
+    return {'scope' : 'VISIBLE', 'repeat' : 1}
+
+def setup_export_profile_results(p):
+    setup_modifier_stack_objects(p)
+    bpy.ops.object.y_profile_evaluation_cost(scope='VISIBLE', repeat=1)
+    return {'filepath' : get_temp_filepath('profile.csv')}
+
+def setup_restore_viewport_quality(p):
+    setup_modifier_stack_objects(p)
+
+    # Same state as left by adaptive viewport quality
+    for obj in bpy.context.scene.objects:
+        mod = obj.modifiers.get('Subdivision')
+        d = obj.yetc.degraded_mods.add()
+        d.name = mod.name
+        d.kind = 'LEVELS'
+        d.value = mod.levels
+        mod.levels = 0
+    return {}
+
+def setup_make_subsurf_last(p):
+    obj = new_grid_object('Grid', p['verts'])
+    add_modifier_stack(obj, p['mod_depth'], subsurf_first=True)
+    return {}
+
+def setup_normalize_modifier_stacks(p):
+    for i in range(p['objects']):
+        obj = new_grid_object('Grid.%03d' % i, 100, location=(i * 2.5, 0, 0))
+        add_modifier_stack(obj, p['mod_depth'], subsurf_first=i % 2 == 0)
+    return {'scope' : 'SCENE'}
+
+def setup_apply_modifiers_with_shapekeys(p):
+    obj = setup_shape_key_mesh(p)
+    names = add_modifier_stack(obj, p['mod_depth'])
+    return {
+        'my_collection' : [{'name' : n, 'checked' : True} for n in names],
+        'use_cache' : False,
+        }
+
+def setup_rigged_mesh(p, posed=True):
+    rig = new_armature_object('Rig', p['bones'])
+    if posed: pose_armature(rig)
+    obj = new_grid_object('Grid', p['verts'])
+    add_bone_vertex_groups(obj, rig)
+    add_armature_modifier(obj, rig)
+    return obj, rig
+
+def setup_apply_modifiers_with_shapekeys_armature(p):
+    obj, rig = setup_rigged_mesh(p)
+    add_shape_keys(obj, p['shape_keys'])
+    return {
+        'my_collection' : [{'name' : 'Armature', 'checked' : True}],
+        'disable_armatures' : False,
+        'use_cache' : False,
+        }
+
+def setup_remove_unused_vertex_groups(p):
+    obj, rig = setup_rigged_mesh(p)
+    add_empty_vertex_groups(obj, p['bones'])
+    return {}
+
+def setup_transfer_weights_and_setup(p):
+    obj, rig = setup_rigged_mesh(p, posed=False)
+    target = new_grid_object('Target', p['verts'], location=(0, 0, 0.01))
+
+    # Last selected (active) object is the source
+    target.select_set(True)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    return {'do_normalize' : True}
+
+def setup_weight_paint_enable_select_bones(p):
+    setup_rigged_mesh(p)
+    return {}
+
+def setup_flip_mirror_modifier(p):
+    obj = new_grid_object('Grid', p['verts'])
+    add_mirror_modifier(obj)
+    return {}
+
+def setup_flip_vertex_groups(p):
+    obj = new_grid_object('Grid', p['verts'])
+    add_mirrored_vertex_groups(obj, p['bones'])
+    return {}
+
+def setup_flip_multires_mesh(p):
+    obj = new_grid_object('Grid', p['verts'])
+    add_multires_modifier(obj)
+    return {}
+
+def setup_apply_multires_mirror(p):
+    obj = new_grid_object('Grid', p['verts'])
+    obj.modifiers.new('Mirror', 'MIRROR')
+    add_multires_modifier(obj)
+    return {}
+
+def setup_outline_objects(p):
+    objs = [new_grid_object('Grid.%03d' % i, p['verts'], location=(i * 2.5, 0, 0)) for i in range(p['objects'])]
+    for o in objs: o.select_set(True)
+    return objs
+
+def setup_add_outline(p):
+    setup_outline_objects(p)
+
+    # There's no viewport to set in background mode
+    return {'viewport_bc' : False}
+
+def setup_remove_outline(p):
+    setup_outline_objects(p)
+    bpy.ops.object.y_add_outline(viewport_bc=False)
+    return {}
+
+def setup_toggle_rest_pos(p):
+    rig = new_armature_object('Rig', p['bones'])
+    pose_armature(rig)
+    return {}
+
+def setup_apply_armature(p):
+    obj, rig = setup_rigged_mesh(p)
+    add_shape_keys(obj, p['shape_keys'])
+    bpy.context.view_layer.objects.active = rig
+    return {'apply_above' : True}
+
+def setup_loop_keyframes(p):
+    rig = new_armature_object('Rig', p['bones'])
+    add_bone_keyframes(rig, p['keys_per_bone'])
+    return {'active_bone_only' : False}
+
+# Operators that can't be run without user interaction or special rigs
+skipped_operators = {
+    'mesh.y_merge_vg_down' : 'Merged groups are only set on invoke',
+    'view3d.y_toggle_gpu_subdiv' : 'Changes user preferences',
+    'mesh.y_clear_shape_keys_cache' : 'Nothing to measure',
+    'object.y_add_strokegen_outline' : 'Needs StrokeGen addon',
+    'object.y_apply_rigify_to_metarig' : 'Needs generated Rigify rig',
+    'object.y_apply_rigiy_deform' : 'Needs generated Rigify rig',
+    'object.y_regenerate_rigify' : 'Needs generated Rigify rig',
+    }
+
+# Default parameters, each case only sweeps the parameters it actually uses
+default_params = {
+    'verts' : 2500,
+    'shape_keys' : 8,
+    'mod_depth' : 3,
+    'bones' : 8,
+    'keys_per_bone' : 10,
+    'objects' : 2,
+    }
+
+default_sweeps = {
+    'verts' : [625, 2500, 10000, 40000],
+    'shape_keys' : [2, 8, 32, 128],
+    'mod_depth' : [1, 3, 9, 27],
+    'bones' : [2, 8, 32, 128],
+    'keys_per_bone' : [5, 10, 25, 50],
+    'objects' : [2, 4, 8, 16],
+    }
+
+cases = [
+    ('union_meshes', 'mesh_tools', 'mesh.y_union_meshes', setup_union_meshes, ['verts', 'objects']),
+    ('union_meshes_scattered', 'mesh_tools', 'mesh.y_union_meshes', setup_union_meshes_scattered, ['objects']),
+    ('union_meshes_one_by_one', 'mesh_tools', 'mesh.y_union_meshes', setup_union_meshes_one_by_one, ['verts', 'objects']),
+    ('shape_key_reset', 'mesh_tools', 'mesh.y_shape_key_reset', setup_shape_key_reset, ['verts', 'shape_keys']),
+    ('apply_shape_key', 'mesh_tools', 'mesh.y_apply_shape_key', setup_apply_shape_key, ['verts', 'shape_keys']),
+    ('shape_key_to_attribute', 'mesh_tools', 'mesh.y_shape_key_to_attribute', setup_shape_key_to_attribute, ['verts', 'shape_keys']),
+    ('attribute_to_shape_key', 'mesh_tools', 'mesh.y_attribute_to_shape_key', setup_attribute_to_shape_key, ['verts', 'shape_keys']),
+    ('mirror_shape_keys', 'mesh_tools', 'mesh.y_mirror_shape_keys', setup_mirror_shape_keys, ['verts', 'shape_keys']),
+    ('split_shape_keys', 'mesh_tools', 'mesh.y_split_shape_keys', setup_split_shape_keys, ['verts', 'shape_keys']),
+    ('corrective_shape_key', 'mesh_tools', 'mesh.y_corrective_shape_key', setup_corrective_shape_key, ['verts', 'bones']),
+    ('transfer_shape_keys', 'mesh_tools', 'mesh.y_transfer_shape_keys', setup_transfer_shape_keys, ['verts', 'shape_keys']),
+    ('export_shape_key_archive', 'mesh_tools', 'mesh.y_export_shape_key_archive', setup_export_shape_key_archive, ['verts', 'shape_keys']),
+    ('import_shape_key_archive', 'mesh_tools', 'mesh.y_import_shape_key_archive', setup_import_shape_key_archive, ['verts', 'shape_keys']),
+    ('export_quantized_morphs', 'mesh_tools', 'mesh.y_export_quantized_morphs', setup_export_quantized_morphs, ['verts', 'shape_keys']),
+    ('make_subsurf_last', 'mesh_tools', 'mesh.y_make_subsurf_last', setup_make_subsurf_last, ['mod_depth']),
+    ('normalize_modifier_stacks', 'mesh_tools', 'object.y_normalize_modifier_stacks', setup_normalize_modifier_stacks, ['objects', 'mod_depth']),
+    ('apply_modifiers_with_shapekeys', 'mesh_tools', 'mesh.y_apply_modifiers_with_shapekeys', setup_apply_modifiers_with_shapekeys, ['verts', 'shape_keys', 'mod_depth']),
+    ('apply_modifiers_with_shapekeys_armature', 'mesh_tools', 'mesh.y_apply_modifiers_with_shapekeys', setup_apply_modifiers_with_shapekeys_armature, ['verts', 'shape_keys', 'bones']),
+    ('remove_unused_vertex_groups', 'vg_tools', 'mesh.y_remove_unused_vertex_groups', setup_remove_unused_vertex_groups, ['verts', 'bones']),
+    ('transfer_weights_and_setup', 'vg_tools', 'mesh.y_transfer_weights_and_setup', setup_transfer_weights_and_setup, ['verts', 'bones']),
+    ('weight_paint_enable_select_bones', 'vg_tools', 'mesh.y_weight_paint_enable_select_bones', setup_weight_paint_enable_select_bones, ['bones']),
+    ('flip_mirror_modifier', 'mirror_tools', 'mesh.y_flip_mirror_modifier', setup_flip_mirror_modifier, ['verts']),
+    ('flip_vertex_groups', 'mirror_tools', 'mesh.y_flip_vertex_groups', setup_flip_vertex_groups, ['bones']),
+    ('flip_multires_mesh', 'mirror_tools', 'mesh.y_flip_multires_mesh', setup_flip_multires_mesh, ['verts']),
+    ('apply_multires_mirror', 'mirror_tools', 'mesh.y_apply_multires_mirror', setup_apply_multires_mirror, ['verts']),
+    ('add_outline', 'outline_tools', 'object.y_add_outline', setup_add_outline, ['verts', 'objects']),
+    ('remove_outline', 'outline_tools', 'object.y_remove_outline', setup_remove_outline, ['objects']),
+    ('fix_blender_420_outlines', 'outline_tools', 'object.y_fix_blender_420_outlines', setup_remove_outline, ['objects']),
+    ('profile_evaluation_cost', 'viewport_tools', 'object.y_profile_evaluation_cost', setup_profile_evaluation_cost, ['objects', 'mod_depth']),
+    ('export_profile_results', 'viewport_tools', 'object.y_export_profile_results', setup_export_profile_results, ['objects']),
+    ('restore_viewport_quality', 'viewport_tools', 'view3d.y_restore_viewport_quality', setup_restore_viewport_quality, ['objects']),
+    ('toggle_rest_pos', 'pose_tools', 'object.y_toggle_rest_pos', setup_toggle_rest_pos, ['bones']),
+    ('apply_armature', 'pose_tools', 'object.y_apply_armature', setup_apply_armature, ['verts', 'shape_keys', 'bones']),
+    ('loop_keyframes', 'pose_tools', 'pose.y_loop_keyframes', setup_loop_keyframes, ['bones', 'keys_per_bone']),
+    ]
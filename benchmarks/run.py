@@ -0,0 +1,165 @@
+# Headless benchmarks for the addon operators
+# Run with background Blender:
+#   blender -b --factory-startup --python benchmarks/run.py -- --output results.json
+# Or with bpy module:
+#   python benchmarks/run.py --output results.json
+
+import sys, os, time, json, gc, platform, argparse
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bpy
+import numpy as np
+import scenes, cases
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON_NAME = 'ucup_etc_tools'
+ADDON_MODULES = ['mesh_tools', 'vg_tools', 'mirror_tools', 'pose_tools', 'outline_tools', 'viewport_tools']
+
+def load_addon():
+    # Folder name is not necessarily a valid module name, so load it by path
+    spec = importlib.util.spec_from_file_location(ADDON_NAME, os.path.join(REPO_DIR, '__init__.py'), submodule_search_locations=[REPO_DIR])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_NAME] = addon
+    spec.loader.exec_module(addon)
+    addon.register()
+    return addon
+
+def get_addon_operators():
+    operators = []
+    for name in ADDON_MODULES:
+        module = sys.modules[ADDON_NAME + '.' + name]
+        for cls in module.__dict__.values():
+            if isinstance(cls, type) and issubclass(cls, bpy.types.Operator) and cls.__module__ == module.__name__:
+                operators.append((name, cls.bl_idname))
+    return operators
+
+def get_operator(idname):
+    category, name = idname.split('.')
+    return getattr(getattr(bpy.ops, category), name)
+
+def run_once(idname, setup, params):
+    scenes.clear_scene()
+
+    startTime = time.perf_counter()
+    kwargs = setup(params)
+    setupTime = time.perf_counter() - startTime
+
+    op = get_operator(idname)
+    if not op.poll():
+        return {'setup_time' : setupTime, 'error' : 'Poll failed'}
+
+    gc.collect()
+    startTime = time.perf_counter()
+    try: result = op('EXEC_DEFAULT', **kwargs)
+    except Exception as e: return {'setup_time' : setupTime, 'error' : str(e).strip()}
+    opTime = time.perf_counter() - startTime
+
+    return {'setup_time' : setupTime, 'time' : opTime, 'result' : sorted(result)}
+
+def get_scaling_exponent(values, times):
+    # Slope on log-log scale, 1.0 means linear scaling
+    pairs = [(v, t) for v, t in zip(values, times) if v > 0 and t and t > 0]
+    if len(pairs) < 2: return None
+    x, y = np.log(np.array(pairs)).T
+    return float(np.polyfit(x, y, 1)[0])
+
+def run_case(case, repeat, quick):
+    name, module, idname, setup, sweep_params = case
+    print('benchmark:', name)
+
+    sweeps = {}
+    for param in sweep_params:
+        values = cases.default_sweeps[param]
+        if quick: values = values[:2]
+
+        points = []
+        for value in values:
+            params = dict(cases.default_params)
+            params[param] = value
+
+            runs = [run_once(idname, setup, params) for i in range(repeat)]
+            times = [r['time'] for r in runs if 'time' in r]
+            point = {
+                'value' : value,
+                'params' : params,
+                'times' : times,
+                'min' : min(times) if times else None,
+                'median' : float(np.median(times)) if times else None,
+                'setup_time' : float(np.median([r['setup_time'] for r in runs])),
+                }
+            errors = [r['error'] for r in runs if 'error' in r]
+            if errors: point['error'] = errors[0]
+            points.append(point)
+
+            print('  %s=%s: %s' % (param, value, '%0.4fs' % point['median'] if times else point['error']))
+
+        sweeps[param] = {
+            'points' : points,
+            'exponent' : get_scaling_exponent([p['value'] for p in points], [p['median'] for p in points]),
+            }
+
+    return {'name' : name, 'module' : module, 'operator' : idname, 'sweeps' : sweeps}
+
+def write_csv(filepath, results):
+    import csv
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['case', 'operator', 'param', 'value', 'min', 'median', 'setup_time', 'error'])
+        for r in results['cases']:
+            for param, sweep in r['sweeps'].items():
+                for p in sweep['points']:
+                    writer.writerow([r['name'], r['operator'], param, p['value'], p['min'], p['median'], p['setup_time'], p.get('error', '')])
+
+def main():
+    argv = sys.argv[sys.argv.index('--')+1:] if '--' in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Benchmark Ucup Etc Tools operators')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON output file')
+    parser.add_argument('--csv', default='', help='Also write flat CSV into this file')
+    parser.add_argument('--cases', default='', help='Comma separated case names to run (default all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs for each point')
+    parser.add_argument('--quick', action='store_true', help='Only run two smallest values of each sweep')
+    args = parser.parse_args(argv)
+
+    addon = load_addon()
+
+    selected = [c for c in cases.cases if not args.cases or c[0] in args.cases.split(',')]
+    case_operators = set(c[2] for c in cases.cases)
+
+    results = {
+        'blender_version' : bpy.app.version_string,
+        'addon_version' : '.'.join(str(v) for v in addon.bl_info['version']),
+        'python_version' : platform.python_version(),
+        'numpy_version' : np.__version__,
+        'platform' : platform.platform(),
+        'background' : bpy.app.background,
+        'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat' : args.repeat,
+        'cases' : [],
+        'skipped' : [],
+        }
+
+    startTime = time.perf_counter()
+    for case in selected:
+        results['cases'].append(run_case(case, args.repeat, args.quick))
+
+    # Make sure new operators won't be silently missing from benchmarks
+    for module, idname in get_addon_operators():
+        if idname in case_operators: continue
+        reason = cases.skipped_operators.get(idname, 'No benchmark case yet')
+        results['skipped'].append({'module' : module, 'operator' : idname, 'reason' : reason})
+
+    results['total_time'] = time.perf_counter() - startTime
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.csv: write_csv(args.csv, results)
+
+    print('benchmark: Done in %0.2f seconds, results written to %s' % (results['total_time'], args.output))
+
+    addon.unregister()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# Synthetic scene generators for benchmarks
+# Everything is generated from parameters so results are comparable between runs
+
+import bpy, math
+import numpy as np
+
+def clear_scene():
+    scene = bpy.context.scene
+    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    # Remove all generated datablocks, addon classes stay registered unlike reading factory settings
+    ids = []
+    for col in (bpy.data.objects, bpy.data.meshes, bpy.data.armatures, bpy.data.actions, bpy.data.materials):
+        ids.extend(col)
+    bpy.data.batch_remove(ids)
+
+    scene.frame_set(1)
+
+def link_object(obj, select=True, active=True):
+    view_layer = bpy.context.view_layer
+    bpy.context.scene.collection.objects.link(obj)
+    obj.select_set(select)
+    if active: view_layer.objects.active = obj
+    return obj
+
+def new_grid_object(name, num_verts, size=2.0, location=(0, 0, 0)):
+    res = max(int(math.sqrt(num_verts)), 2)
+    xs = np.linspace(-size / 2, size / 2, res)
+    x, y = np.meshgrid(xs, xs)
+    z = 0.1 * np.sin(x * math.pi) * np.cos(y * math.pi)
+    co = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1)
+
+    idx = np.arange(res * res).reshape(res, res)
+    quads = np.stack([idx[:-1, :-1], idx[:-1, 1:], idx[1:, 1:], idx[1:, :-1]], axis=-1).reshape(-1, 4)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(co.tolist(), [], quads.tolist())
+    mesh.update()
+
+    obj = bpy.data.objects.new(name, mesh)
+    obj.location = location
+    return link_object(obj)
+
+def new_sphere_object(name, num_verts, radius=1.0, location=(0, 0, 0)):
+    # UV sphere has about segments * (rings - 1) vertices
+    segments = max(int(math.sqrt(num_verts * 2)), 8)
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=segments, ring_count=max(segments // 2, 4), radius=radius, location=location)
+    obj = bpy.context.object
+    obj.name = name
+    return obj
+
+def add_shape_keys(obj, num_keys, seed=0):
+    rng = np.random.default_rng(seed)
+    num_verts = len(obj.data.vertices)
+
+    basis = obj.shape_key_add(name='Basis', from_mix=False)
+    co = np.empty(num_verts * 3, dtype=np.float32)
+    basis.data.foreach_get('co', co)
+
+    for i in range(num_keys):
+        kb = obj.shape_key_add(name='Key %03d' % i, from_mix=False)
+
+        # Each key only moves part of the mesh like a real blend shape
+        offset = rng.normal(0.0, 0.02, (num_verts, 3)).astype(np.float32)
+        offset[rng.random(num_verts) > 0.3] = 0.0
+        kb.data.foreach_set('co', co + offset.ravel())
+        kb.value = rng.random()
+
+    obj.active_shape_key_index = 1 if num_keys > 0 else 0
+
+def add_modifier_stack(obj, depth, subsurf_first=False):
+    types = ['DISPLACE', 'SIMPLE_DEFORM', 'SMOOTH', 'CAST', 'WAVE']
+    if subsurf_first:
+        obj.modifiers.new('Subdivision', 'SUBSURF')
+
+    for i in range(depth):
+        mod = obj.modifiers.new('%s %03d' % (types[i % len(types)].title(), i), types[i % len(types)])
+        if mod.type == 'DISPLACE':
+            mod.strength = 0.05
+        elif mod.type == 'SIMPLE_DEFORM':
+            mod.angle = 0.1
+        elif mod.type == 'CAST':
+            mod.factor = 0.1
+
+    return [m.name for m in obj.modifiers]
+
+def new_armature_object(name, num_bones, length=2.0):
+    arm = bpy.data.armatures.new(name)
+    rig = link_object(bpy.data.objects.new(name, arm))
+
+    # Bones are a chain along X axis covering the generated grid
+    bpy.ops.object.mode_set(mode='EDIT')
+    step = length / num_bones
+    parent = None
+    for i in range(num_bones):
+        eb = arm.edit_bones.new('Bone.%03d' % i)
+        eb.head = (-length / 2 + step * i, 0, 0)
+        eb.tail = (-length / 2 + step * (i + 1), 0, 0)
+        if parent:
+            eb.parent = parent
+            eb.use_connect = True
+        parent = eb
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    return rig
+
+def pose_armature(rig, angle=0.2):
+    for pb in rig.pose.bones:
+        pb.rotation_mode = 'XYZ'
+        pb.rotation_euler = (0, 0, angle)
+
+def add_bone_vertex_groups(obj, rig, blend=True):
+    co = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+    obj.data.vertices.foreach_get('co', co)
+    x = co.reshape(-1, 3)[:, 0]
+
+    bones = rig.data.bones
+    length = bones[-1].tail_local[0] - bones[0].head_local[0]
+    pos = np.clip((x - bones[0].head_local[0]) / length * len(bones), 0, len(bones) - 1e-4)
+
+    # Linear blend between two neighbouring bones
+    for i, bone in enumerate(bones):
+        vg = obj.vertex_groups.new(name=bone.name)
+        weights = np.clip(1.0 - np.abs(pos - (i + 0.5)), 0.0, 1.0) if blend else (pos.astype(int) == i).astype(float)
+        for w in np.unique(np.round(weights[weights > 0.0], 2)):
+            ids = np.nonzero(np.isclose(np.round(weights, 2), w))[0]
+            vg.add(ids.tolist(), float(w), 'REPLACE')
+
+def add_armature_modifier(obj, rig):
+    mod = obj.modifiers.new('Armature', 'ARMATURE')
+    mod.object = rig
+    return mod
+
+def add_bone_keyframes(rig, keys_per_bone, frame_count=100, seed=0):
+    rng = np.random.default_rng(seed)
+    step = max(frame_count // max(keys_per_bone, 1), 1)
+    for pb in rig.pose.bones:
+        pb.rotation_mode = 'XYZ'
+        for f in range(1, frame_count + 1, step):
+            pb.location = rng.normal(0.0, 0.05, 3)
+            pb.keyframe_insert('location', frame=f)
+
+def add_mirrored_vertex_groups(obj, num_groups, seed=0):
+    rng = np.random.default_rng(seed)
+    num_verts = len(obj.data.vertices)
+    for i in range(num_groups):
+        for side in ('L', 'R'):
+            vg = obj.vertex_groups.new(name='Group.%s.%03d' % (side, i))
+            ids = np.nonzero(rng.random(num_verts) < 0.2)[0]
+            vg.add(ids.tolist(), 1.0, 'REPLACE')
+
+def add_empty_vertex_groups(obj, num_groups):
+    for i in range(num_groups):
+        obj.vertex_groups.new(name='Unused.%03d' % i)
+
+def add_mirror_modifier(obj):
+    mod = obj.modifiers.new('Mirror', 'MIRROR')
+    mod.use_axis = (True, False, False)
+
+    # Mirror modifier must be first
+    while obj.modifiers[0] != mod:
+        bpy.ops.object.modifier_move_up(modifier=mod.name)
+
+    return mod
+
+def add_multires_modifier(obj, levels=1):
+    mod = obj.modifiers.new('Multires', 'MULTIRES')
+    while obj.modifiers[0] != mod:
+        bpy.ops.object.modifier_move_up(modifier=mod.name)
+    for i in range(levels):
+        bpy.ops.object.multires_subdivide(modifier=mod.name, mode='CATMULL_CLARK')
+    return mod
@@ -1,4 +1,6 @@
 import bpy, time
+import numpy as np
+from collections import OrderedDict
 
 def is_bl_newer_than(major, minor=0, patch=0):
     return bpy.app.version >= (major, minor, patch)
@@ -69,42 +71,2227 @@ def get_datablock_fcurves(obj):
 
     return channelbag.fcurves
 
-def new_fcurve(obj, data_path):
+def new_fcurve(obj, data_path, index=0):
     if not obj.animation_data:
         return None
 
     action = obj.animation_data.action
 
     if not is_bl_newer_than(5):
-        return action.fcurves.new(data_path=data_path) #, index=2)
+        return action.fcurves.new(data_path=data_path, index=index)
 
     from bpy_extras import anim_utils
 
-    # Create new action slot
-    slot = action.slots.new(id_type=obj.id_type, name=obj.name)
+    # Use action slot of the datablock, create new one if there's none
+    slot = obj.animation_data.action_slot
+    if not slot:
+        slot = action.slots.new(id_type=obj.id_type, name=obj.name)
+        obj.animation_data.action_slot = slot
 
     # Ensure channelbag
     channelbag = anim_utils.action_ensure_channelbag_for_slot(action, slot)
-    return channelbag.fcurves.new(data_path) #,index=2)
+    return channelbag.fcurves.new(data_path, index=index)
+
+def get_fcurve_group(obj, name):
+    action = obj.animation_data.action
+
+    if not is_bl_newer_than(5):
+        groups = action.groups
+    else:
+        from bpy_extras import anim_utils
+        channelbag = anim_utils.action_ensure_channelbag_for_slot(action, obj.animation_data.action_slot)
+        groups = channelbag.groups
+
+    group = groups.get(name)
+    if not group: group = groups.new(name)
+
+    return group
 
 def get_action_fcurves(action):
     if not is_bl_newer_than(5):
         return [fc for fc in action.fcurves]
 
-    from bpy_extras import anim_utils
+    from bpy_extras import anim_utils
+
+    fcurves = []
+    for slot in action.slots:
+        channelbag = anim_utils.action_get_channelbag_for_slot(action, slot)
+        for fc in channelbag.fcurves:
+            fcurves.append(fc)
+
+    return fcurves
+
+shape_key_properties = ["interpolation", "mute", "name", "relative_key", "slider_max", "slider_min", "value", "vertex_group"]
+
+def get_shape_key_props(obj):
+    list_properties = []
+
+    for key_b in obj.data.shape_keys.key_blocks:
+        properties_object = {p:None for p in shape_key_properties}
+        properties_object["name"] = key_b.name
+        properties_object["mute"] = key_b.mute
+        properties_object["interpolation"] = key_b.interpolation
+        properties_object["relative_key"] = key_b.relative_key.name
+        properties_object["slider_max"] = key_b.slider_max
+        properties_object["slider_min"] = key_b.slider_min
+        properties_object["value"] = key_b.value
+        properties_object["vertex_group"] = key_b.vertex_group
+        list_properties.append(properties_object)
+
+    return list_properties
+
+def set_shape_key_props(obj, list_properties):
+    key_blocks = obj.data.shape_keys.key_blocks
+
+    for i, props in enumerate(list_properties):
+        key_b = key_blocks[i]
+        key_b.name = props["name"]
+        key_b.interpolation = props["interpolation"]
+        key_b.mute = props["mute"]
+        key_b.slider_max = props["slider_max"]
+        key_b.slider_min = props["slider_min"]
+        key_b.value = props["value"]
+        key_b.vertex_group = props["vertex_group"]
+
+        rel_key = key_blocks.get(props["relative_key"])
+        if rel_key: key_b.relative_key = rel_key
+
+fcurve_props = ['extrapolation', 'mute', 'hide', 'lock', 'select', 'color_mode', 'color', 'auto_smoothing']
+
+keyframe_vector_props = ['co', 'handle_left', 'handle_right']
+keyframe_float_props = ['amplitude', 'back', 'period']
+keyframe_bool_props = ['select_control_point', 'select_left_handle', 'select_right_handle']
+
+# Enum properties can't be accessed by foreach_get, so they are stored as item indices
+# Handle types need to be set before the handles
+keyframe_enum_props = ['interpolation', 'easing', 'handle_left_type', 'handle_right_type', 'type']
+
+fmodifier_common_props = ['mute', 'show_expanded', 'use_influence', 'influence', 'use_restricted_range', 'frame_start', 'frame_end', 'blend_in', 'blend_out']
+
+# Ordered so properties that change other properties are set first (e.g. poly_order and coefficients)
+fmodifier_props = {
+    'GENERATOR' : ['mode', 'use_additive', 'poly_order', 'coefficients'],
+    'FNGENERATOR' : ['function_type', 'use_additive', 'amplitude', 'phase_multiplier', 'phase_offset', 'value_offset'],
+    'ENVELOPE' : ['reference_value', 'default_min', 'default_max'],
+    'CYCLES' : ['mode_before', 'cycles_before', 'mode_after', 'cycles_after'],
+    'NOISE' : ['blend_type', 'scale', 'strength', 'phase', 'offset', 'depth', 'lacunarity', 'roughness'],
+    'LIMITS' : ['use_min_x', 'use_min_y', 'use_max_x', 'use_max_y', 'min_x', 'min_y', 'max_x', 'max_y'],
+    'STEPPED' : ['frame_step', 'frame_offset', 'use_frame_start', 'frame_start', 'use_frame_end', 'frame_end'],
+}
+
+def get_enum_identifiers(rna_type, prop):
+    return [item.identifier for item in rna_type.bl_rna.properties[prop].enum_items]
+
+def get_fmodifier_snapshot(mod):
+    snapshot = {
+        'type' : mod.type,
+        'props' : {},
+    }
+
+    for prop in fmodifier_common_props + fmodifier_props.get(mod.type, []):
+        if not hasattr(mod, prop): continue
+        val = getattr(mod, prop)
+        if hasattr(val, '__len__') and not isinstance(val, str):
+            val = tuple(val)
+        snapshot['props'][prop] = val
+
+    if mod.type == 'ENVELOPE':
+        snapshot['control_points'] = [(cp.frame, cp.min, cp.max) for cp in mod.control_points]
+
+    return snapshot
+
+def get_fcurve_snapshot(fc):
+    kps = fc.keyframe_points
+    num_kps = len(kps)
+
+    snapshot = {
+        'data_path' : fc.data_path,
+        'array_index' : fc.array_index,
+        'group' : fc.group.name if fc.group else '',
+        'props' : {},
+        'count' : num_kps,
+        'keyframes' : {},
+        'modifiers' : [get_fmodifier_snapshot(m) for m in fc.modifiers],
+    }
+
+    for prop in fcurve_props:
+        if not hasattr(fc, prop): continue
+        val = getattr(fc, prop)
+        if hasattr(val, '__len__') and not isinstance(val, str):
+            val = tuple(val)
+        snapshot['props'][prop] = val
+
+    keyframes = snapshot['keyframes']
+
+    for prop in keyframe_vector_props:
+        arr = np.empty(num_kps * 2, dtype=np.float32)
+        kps.foreach_get(prop, arr)
+        keyframes[prop] = arr
+
+    for prop in keyframe_float_props:
+        arr = np.empty(num_kps, dtype=np.float32)
+        kps.foreach_get(prop, arr)
+        keyframes[prop] = arr
+
+    for prop in keyframe_bool_props:
+        arr = np.empty(num_kps, dtype=bool)
+        kps.foreach_get(prop, arr)
+        keyframes[prop] = arr
+
+    for prop in keyframe_enum_props:
+        ids = {identifier : i for i, identifier in enumerate(get_enum_identifiers(bpy.types.Keyframe, prop))}
+        keyframes[prop] = np.fromiter((ids[getattr(kp, prop)] for kp in kps), dtype=np.int16, count=num_kps)
+
+    return snapshot
+
+def new_fcurve_from_snapshot(datablock, snapshot):
+    fc = new_fcurve(datablock, snapshot['data_path'], snapshot['array_index'])
+    if not fc: return None
+
+    if snapshot['group'] != '':
+        try: fc.group = get_fcurve_group(datablock, snapshot['group'])
+        except Exception as e: print(e)
+
+    for prop, val in snapshot['props'].items():
+        try: setattr(fc, prop, val)
+        except Exception as e: pass
+
+    kps = fc.keyframe_points
+    num_kps = snapshot['count']
+    kps.add(num_kps)
+
+    if num_kps > 0:
+        keyframes = snapshot['keyframes']
+
+        # Only set enum values that are different from the new keyframe default
+        for prop in keyframe_enum_props:
+            identifiers = get_enum_identifiers(bpy.types.Keyframe, prop)
+            default = identifiers.index(getattr(kps[0], prop))
+            codes = keyframes[prop]
+            for i in np.flatnonzero(codes != default):
+                setattr(kps[int(i)], prop, identifiers[codes[i]])
+
+        for prop in keyframe_vector_props + keyframe_float_props + keyframe_bool_props:
+            kps.foreach_set(prop, keyframes[prop])
+
+    for msnap in snapshot['modifiers']:
+        m = fc.modifiers.new(type=msnap['type'])
+
+        for prop, val in msnap['props'].items():
+            try: setattr(m, prop, val)
+            except Exception as e: pass
+
+        for frame, cp_min, cp_max in msnap.get('control_points', []):
+            cp = m.control_points.add(frame)
+            cp.min = cp_min
+            cp.max = cp_max
+
+    fc.update()
+
+    return fc
+
+def save_shape_key_fcurves(obj):
+    key = obj.data.shape_keys
+
+    if not key.animation_data or not key.animation_data.action:
+        return '', []
+
+    ori_action_name = key.animation_data.action.name
+    ori_fcurves = [get_fcurve_snapshot(fc) for fc in get_datablock_fcurves(key)]
+
+    return ori_action_name, ori_fcurves
+
+def recover_shape_key_fcurves(obj, ori_action_name, ori_fcurves):
+    if not ori_fcurves: return
+
+    key = obj.data.shape_keys
+    key.animation_data_create()
+    key.animation_data.action = bpy.data.actions.new(name=ori_action_name)
+
+    for snapshot in ori_fcurves:
+        new_fcurve_from_snapshot(key, snapshot)
+
+class ApplyModifiersStats:
+
+    def __init__(self):
+        self.records = []
+        self.num_items = 1
+        self.start_time = time.time()
+        self.total_time = 0.0
+        self.wm = None
+
+    def begin(self, num_items):
+        self.num_items = max(num_items, 1)
+        self.start_time = time.time()
+
+        self.wm = bpy.context.window_manager
+        try: self.wm.progress_begin(0, self.num_items)
+        except Exception as e: self.wm = None
+
+    def end(self):
+        self.total_time = time.time() - self.start_time
+
+        if self.wm:
+            self.wm.progress_end()
+            self.wm = None
+
+    def update_progress(self, fraction):
+        if self.wm:
+            self.wm.progress_update(max(len(self.records)-1, 0) + min(fraction, 1.0))
+
+    def new_record(self, obj, selectedModifiers):
+        self.records.append({
+            'object' : obj.name,
+            'modifiers' : list(selectedModifiers),
+            'method' : '',
+            'num_keys' : len(obj.data.shape_keys.key_blocks) if obj.type == 'MESH' and obj.data.shape_keys else 0,
+            'num_verts' : len(obj.data.vertices) if obj.type == 'MESH' else 0,
+            'stages' : {},
+            'key_times' : [],
+            'total_time' : 0.0,
+            'success' : True,
+            'error' : None,
+            })
+        self.update_progress(0.0)
+
+        return self.records[-1]
+
+    def end_record(self, result, start_time):
+        record = self.records[-1]
+        record['success'], record['error'] = result
+        record['total_time'] = time.time() - start_time
+        self.update_progress(1.0)
+
+    def set_method(self, method):
+        if self.records: self.records[-1]['method'] = method
+
+    def add_stage_time(self, stage, start_time):
+        if not self.records: return
+        stages = self.records[-1]['stages']
+        stages[stage] = stages.get(stage, 0.0) + time.time() - start_time
+
+    def add_key_time(self, seconds):
+        if self.records: self.records[-1]['key_times'].append(seconds)
+
+    def get_summary(self):
+        lines = []
+        for record in self.records:
+            stages = ', '.join('%s %0.2fs' % (stage, t) for stage, t in record['stages'].items())
+            lines.append("%s: %s %0.2fs (%s)" % (record['object'], record['method'], record['total_time'], stages))
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {
+            'total_time' : self.total_time,
+            'records' : self.records,
+            }
+
+    def dump_json(self, filepath):
+        import json
+        with open(filepath, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def get_evaluated_vertex_coords(obj, depsgraph):
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+
+    obj_eval.to_mesh_clear()
+
+    return co.reshape(-1, 3)
+
+def set_shape_key_eval_state(obj, selectedModifiers):
+
+    # Remember everything that will be touched to isolate shape keys
+    state = {
+        'show_only_shape_key' : obj.show_only_shape_key,
+        'active_shape_key_index' : obj.active_shape_key_index,
+        'modifiers' : [(m, m.show_viewport) for m in obj.modifiers],
+        'key_blocks' : [(kb, kb.mute, kb.vertex_group) for kb in obj.data.shape_keys.key_blocks],
+    }
+
+    # Only selected modifiers are evaluated, just like applying them one by one
+    for m in obj.modifiers:
+        if m.name not in selectedModifiers and m.show_viewport:
+            m.show_viewport = False
+
+    # Muted keys and key vertex groups will affect the pinned shape
+    for kb in obj.data.shape_keys.key_blocks:
+        if kb.mute: kb.mute = False
+        if kb.vertex_group != '': kb.vertex_group = ''
+
+    # Pinned shape key will show the key as it is, ignoring value and relative key
+    obj.show_only_shape_key = True
+
+    return state
+
+def recover_shape_key_eval_state(obj, state):
+    for m, show_viewport in state['modifiers']:
+        if m.show_viewport != show_viewport:
+            m.show_viewport = show_viewport
+
+    for kb, mute, vertex_group in state['key_blocks']:
+        if kb.mute != mute: kb.mute = mute
+        if kb.vertex_group != vertex_group: kb.vertex_group = vertex_group
+
+    obj.show_only_shape_key = state['show_only_shape_key']
+    obj.active_shape_key_index = state['active_shape_key_index']
+
+def get_shape_keys_evaluated_coords(obj, selectedModifiers, indices=None, stats=None):
+
+    key_blocks = obj.data.shape_keys.key_blocks
+    if indices == None:
+        indices = range(len(key_blocks))
+
+    coords = None
+    startTime = time.time()
+
+    state = set_shape_key_eval_state(obj, selectedModifiers)
+
+    try:
+        for j, i in enumerate(indices):
+
+            keyTime = time.time()
+            elapsedTime = keyTime - startTime
+            print("apply_modifiers_with_shape_keys: Evaluating shape key %d/%d ('%s', %0.2f seconds since start)" % (i+1, len(key_blocks), key_blocks[i].name, elapsedTime))
+
+            # Pin the shape key so the modifiers are evaluated on top of it
+            obj.active_shape_key_index = i
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            co = get_evaluated_vertex_coords(obj, depsgraph)
+
+            if coords is None:
+                coords = np.empty((len(indices), len(co), 3), dtype=np.float32)
+
+            # Verify number of vertices.
+            elif len(co) != coords.shape[1]:
+                errorInfo = ("Shape keys ended up with different number of vertices!\n"
+                             "All shape keys needs to have the same number of vertices after modifier is applied.\n"
+                             "Otherwise joining such shape keys will fail!")
+                return (None, errorInfo)
+
+            coords[j] = co
+
+            if stats:
+                stats.add_key_time(time.time() - keyTime)
+                stats.update_progress((j+1) / len(indices))
+
+    finally:
+        recover_shape_key_eval_state(obj, state)
+
+    return (coords, None)
+
+def get_evaluated_topology(obj, depsgraph):
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edges)
+    topology = (len(mesh.vertices), len(mesh.edges), len(mesh.polygons), hash(edges.tobytes()))
+
+    obj_eval.to_mesh_clear()
+
+    return topology
+
+def get_shape_keys_evaluated_topologies(obj, selectedModifiers, indices):
+    topologies = []
+
+    state = set_shape_key_eval_state(obj, selectedModifiers)
+
+    try:
+        for i in indices:
+            obj.active_shape_key_index = i
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            topologies.append(get_evaluated_topology(obj, depsgraph))
+    finally:
+        recover_shape_key_eval_state(obj, state)
+
+    return topologies
+
+def check_shape_keys_topology(obj, selectedModifiers, indices=None):
+
+    startTime = time.time()
+    shapesCount = len(obj.data.shape_keys.key_blocks)
+    if shapesCount < 2: return ([], 0.0)
+
+    # Compare basis with the shape key that moves the most
+    if indices == None:
+        indices = [0, get_shape_key_sparse_index(obj).get_most_moving_index()]
+
+    basis_topology, key_topology = get_shape_keys_evaluated_topologies(obj, selectedModifiers, indices)
+    evalTime = (time.time() - startTime) / 2
+
+    if basis_topology == key_topology:
+        return ([], 0.0)
+
+    # Find which modifiers are responsible
+    offending = []
+    for name in selectedModifiers:
+        if not obj.modifiers.get(name): continue
+        basis_topology, key_topology = get_shape_keys_evaluated_topologies(obj, [name], indices)
+        if basis_topology != key_topology:
+            offending.append(name)
+
+    # Only the combination of the modifiers changes the topology
+    if not offending:
+        offending = list(selectedModifiers)
+
+    # Estimated time that would be spent evaluating the rest of shape keys
+    estimate = evalTime * (shapesCount - 2)
+
+    return (offending, estimate)
+
+def get_topology_error_info(offending, estimate):
+    return ("Shape keys will end up with different topology after applying: " + ', '.join(offending) + "\n"
+            "Nothing is applied (about %0.1f seconds of evaluation saved)" % estimate)
+
+def get_shape_keys_evaluated_coords_by_workers(obj, selectedModifiers, num_workers, stats=None):
+    import os, json, shutil, subprocess, tempfile
+
+    if not bpy.app.binary_path:
+        return (None, "Blender executable is not found!")
+
+    key_blocks = obj.data.shape_keys.key_blocks
+    shapesCount = len(key_blocks)
+    num_workers = min(num_workers, shapesCount)
+    startTime = time.time()
+
+    worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shape_key_worker.py')
+    tmp_dir = tempfile.mkdtemp(prefix='ucup_shape_keys_')
+    procs = []
+
+    try:
+        # Save the object and all of its dependencies
+        blend_path = os.path.join(tmp_dir, 'object.blend')
+        bpy.data.libraries.write(blend_path, {obj})
+
+        # Interleave key indices so each worker gets similar amount of work
+        slices = [list(range(w, shapesCount, num_workers)) for w in range(num_workers)]
+
+        for w, indices in enumerate(slices):
+            output = os.path.join(tmp_dir, 'worker_%d.npy' % w)
+            log = open(os.path.join(tmp_dir, 'worker_%d.log' % w), 'w')
+            cmd = [
+                bpy.app.binary_path, '-b', '--factory-startup', '-t', '1',
+                '--python-exit-code', '1', '--python', worker_script, '--',
+                '--blend', blend_path,
+                '--object', obj.name,
+                '--modifiers', json.dumps(selectedModifiers),
+                '--indices', ','.join(str(i) for i in indices),
+                '--frame', str(bpy.context.scene.frame_current),
+                '--output', output,
+            ]
+            try: proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+            except:
+                log.close()
+                raise
+            procs.append((proc, log, output, indices))
+
+        print("apply_modifiers_with_shape_keys: Evaluating %d shape keys using %d workers" % (shapesCount, num_workers))
+
+        coords = None
+        errorInfo = None
+        for w, (proc, log, output, indices) in enumerate(procs):
+            proc.wait()
+            log.close()
+
+            if stats: stats.update_progress((w+1) / len(procs))
+
+            if proc.returncode != 0 or not os.path.exists(output):
+
+                # Log file is removed with the temporary folder, so print it now
+                with open(log.name) as f:
+                    print(f.read())
+                errorInfo = "Shape key worker failed, see the console for its log"
+                continue
+
+            co = np.load(output)
+            if coords is None:
+                coords = np.empty((shapesCount, co.shape[1], 3), dtype=np.float32)
+
+            # Verify number of vertices.
+            elif co.shape[1] != coords.shape[1]:
+                errorInfo = ("Shape keys ended up with different number of vertices!\n"
+                             "All shape keys needs to have the same number of vertices after modifier is applied.\n"
+                             "Otherwise joining such shape keys will fail!")
+                continue
+
+            coords[indices] = co
+
+        if errorInfo:
+            return (None, errorInfo)
+
+        print("apply_modifiers_with_shape_keys: Workers are done in %0.2f seconds" % (time.time() - startTime))
+
+    finally:
+        # Workers still running when something goes wrong are stopped before removing their files
+        for proc, log, output, indices in procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            log.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return (coords, None)
+
+# Modifiers that only move each vertex based on its own position
+per_vertex_deform_types = {'ARMATURE', 'LATTICE', 'HOOK', 'MESH_DEFORM', 'CURVE', 'SIMPLE_DEFORM', 'CAST', 'WARP'}
+
+def get_shape_keys_coords(obj):
+    key_blocks = obj.data.shape_keys.key_blocks
+    num_verts = len(obj.data.vertices)
+
+    coords = np.empty((len(key_blocks), num_verts * 3), dtype=np.float32)
+    for i, kb in enumerate(key_blocks):
+        kb.data.foreach_get('co', coords[i])
+
+    return coords.reshape(len(key_blocks), num_verts, 3)
+
+class ShapeKeySparseIndex:
+    def __init__(self, obj):
+        mesh = obj.data
+        key_blocks = mesh.shape_keys.key_blocks
+        num_verts = len(mesh.vertices)
+
+        self.signature = get_shape_key_sparse_signature(obj)
+        self.num_keys = len(key_blocks)
+
+        # Reference key is always the first key block
+        basis = np.empty(num_verts * 3, dtype=np.float32)
+        key_blocks[0].data.foreach_get('co', basis)
+        self.basis = basis.reshape(num_verts, 3)
+
+        # Only store vertices that actually moves, exact comparison so nothing is lost
+        co = np.empty(num_verts * 3, dtype=np.float32)
+        indices = []
+        deltas = []
+        for kb in key_blocks:
+            kb.data.foreach_get('co', co)
+            delta = co.reshape(num_verts, 3) - self.basis
+            ids = np.flatnonzero(np.any(delta != 0.0, axis=1)).astype(np.int32)
+            indices.append(ids)
+            deltas.append(delta[ids])
+
+        self.offsets = np.zeros(self.num_keys + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(ids) for ids in indices])
+        self.indices = np.concatenate(indices)
+        self.deltas = np.concatenate(deltas)
+
+    def get(self, i):
+        start, end = self.offsets[i], self.offsets[i+1]
+        return self.indices[start:end], self.deltas[start:end]
+
+    def get_counts(self):
+        return np.diff(self.offsets)
+
+    def get_deltas_at(self, i, ids):
+        key_ids, key_deltas = self.get(i)
+        deltas = np.zeros((len(ids), 3), dtype=np.float32)
+        if len(key_ids) == 0: return deltas
+
+        pos = np.minimum(np.searchsorted(key_ids, ids), len(key_ids) - 1)
+        found = key_ids[pos] == ids
+        deltas[found] = key_deltas[pos[found]]
+        return deltas
+
+    def get_coords_at(self, i, ids):
+        return self.basis[ids] + self.get_deltas_at(i, ids)
+
+    def get_relative(self, i, j):
+        # Delta of key i relative to key j, only on vertices moved by either of them
+        ids = np.union1d(self.get(i)[0], self.get(j)[0]).astype(np.int32)
+        return ids, self.get_deltas_at(i, ids) - self.get_deltas_at(j, ids)
+
+    def get_most_moving_index(self):
+        if self.num_keys < 2: return 0
+
+        offsets = [np.abs(self.get(i)[1]).max() if self.offsets[i+1] > self.offsets[i] else 0.0 for i in range(1, self.num_keys)]
+        return int(np.argmax(offsets)) + 1
+
+    @property
+    def nbytes(self):
+        return self.basis.nbytes + self.offsets.nbytes + self.indices.nbytes + self.deltas.nbytes
+
+# Sparse indices per mesh, validated by hash of all shape key coordinates
+shape_key_sparse_cache = {}
+
+def get_shape_key_sparse_signature(obj):
+    import hashlib
+    key_blocks = obj.data.shape_keys.key_blocks
+    num_verts = len(obj.data.vertices)
+
+    # Full coordinates of all keys catch edits from scripts, which happen without depsgraph update
+    h = hashlib.blake2b(digest_size=16)
+    co = np.empty(num_verts * 3, dtype=np.float32)
+    for kb in key_blocks:
+        kb.data.foreach_get('co', co)
+        h.update(co.tobytes())
+
+    return (num_verts, tuple(kb.name for kb in key_blocks), h.hexdigest())
+
+def get_shape_key_sparse_index(obj):
+    mesh = obj.data
+    index = shape_key_sparse_cache.get(mesh.as_pointer())
+    if index and index.signature == get_shape_key_sparse_signature(obj):
+        return index
+
+    index = ShapeKeySparseIndex(obj)
+    shape_key_sparse_cache[mesh.as_pointer()] = index
+    return index
+
+def invalidate_shape_key_sparse_index(mesh):
+    shape_key_sparse_cache.pop(mesh.as_pointer(), None)
+
+def get_vertex_islands(num_verts, edges):
+    a, b = edges[0::2].astype(np.int64), edges[1::2].astype(np.int64)
+    labels = np.arange(num_verts, dtype=np.int64)
+
+    # Hook larger root to smaller one, then compress until every edge has the same labels
+    while True:
+        la, lb = labels[a], labels[b]
+        diff = la != lb
+        if not diff.any(): break
+        np.minimum.at(labels, np.maximum(la[diff], lb[diff]), np.minimum(la[diff], lb[diff]))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels): break
+            labels = jumped
+
+    roots, islands = np.unique(labels, return_inverse=True)
+    return islands, len(roots)
+
+def get_mesh_world_triangles(obj, depsgraph=None):
+    # Use evaluated mesh if depsgraph is passed
+    if depsgraph:
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+    else: mesh = obj.data
+
+    mesh.calc_loop_triangles()
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', tris)
+
+    if depsgraph: obj_eval.to_mesh_clear()
+
+    mat = np.array(obj.matrix_world, dtype=np.float32)
+    co = co.reshape(-1, 3) @ mat[:3, :3].T + mat[:3, 3]
+
+    return co, tris.reshape(-1, 3)
+
+def get_aabb_overlapping_pairs(mins, maxs):
+    # Sweep and prune along x axis
+    order = np.argsort(mins[:, 0], kind='stable')
+    pairs = []
+    active = []
+    for i in order.tolist():
+        active = [j for j in active if maxs[j, 0] >= mins[i, 0]]
+        for j in active:
+            if np.all(mins[i] <= maxs[j]) and np.all(mins[j] <= maxs[i]):
+                pairs.append((j, i))
+        active.append(i)
+    return pairs
+
+def is_point_inside_bvh(bvh, point):
+    location, normal, index, distance = bvh.find_nearest(point)
+    if location is None: return False
+    return (point - location).dot(normal) < 0.0
+
+def get_overlapping_clusters(units):
+    from mathutils.bvhtree import BVHTree
+    from mathutils import Vector
+
+    mins = np.array([co.min(axis=0) if len(co) else np.full(3, np.inf) for co, tris in units])
+    maxs = np.array([co.max(axis=0) if len(co) else np.full(3, -np.inf) for co, tris in units])
+
+    bvhs = {}
+    def get_bvh(i):
+        if i not in bvhs:
+            co, tris = units[i]
+            bvhs[i] = BVHTree.FromPolygons(co.tolist(), tris.tolist())
+        return bvhs[i]
+
+    parents = list(range(len(units)))
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i, j in get_aabb_overlapping_pairs(mins, maxs):
+        if find(i) == find(j): continue
+
+        touching = bool(get_bvh(i).overlap(get_bvh(j)))
+
+        # Part fully inside the other part doesn't have intersecting faces
+        if not touching:
+            if np.all(mins[i] >= mins[j]) and np.all(maxs[i] <= maxs[j]):
+                touching = is_point_inside_bvh(get_bvh(j), Vector(units[i][0][0]))
+            elif np.all(mins[j] >= mins[i]) and np.all(maxs[j] <= maxs[i]):
+                touching = is_point_inside_bvh(get_bvh(i), Vector(units[j][0][0]))
+
+        if touching:
+            parents[find(j)] = find(i)
+
+    clusters = {}
+    for i in range(len(units)):
+        clusters.setdefault(find(i), []).append(i)
+
+    return list(clusters.values())
+
+def get_mesh_island_units(obj):
+    mesh = obj.data
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edges)
+    islands, num_islands = get_vertex_islands(len(mesh.vertices), edges)
+
+    co, tris = get_mesh_world_triangles(obj)
+    tri_islands = islands[tris[:, 0]]
+
+    # Group vertices and triangles by island, triangles use island local vertex indices
+    order = np.argsort(islands, kind='stable')
+    counts = np.bincount(islands, minlength=num_islands)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    local = np.empty(len(co), dtype=np.int64)
+    local[order] = np.arange(len(co)) - np.repeat(starts, counts)
+
+    tri_order = np.argsort(tri_islands, kind='stable')
+    tri_counts = np.bincount(tri_islands, minlength=num_islands)
+    tri_starts = np.concatenate(([0], np.cumsum(tri_counts)[:-1]))
+
+    units = []
+    for i in range(num_islands):
+        verts = order[starts[i]:starts[i] + counts[i]]
+        island_tris = tris[tri_order[tri_starts[i]:tri_starts[i] + tri_counts[i]]]
+        units.append((co[verts], local[island_tris]))
+
+    return islands, units
+
+# Non-manifold edge and vertex counts per mesh, cleared when the mesh is updated
+mesh_manifold_cache = {}
+
+def get_mesh_non_manifold_counts(mesh):
+    num_verts, num_edges, num_loops = len(mesh.vertices), len(mesh.edges), len(mesh.loops)
+
+    edge_verts = np.empty(num_edges * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edge_verts)
+    loop_edges = np.empty(num_loops, dtype=np.int32)
+    mesh.loops.foreach_get('edge_index', loop_edges)
+    loop_verts = np.empty(num_loops, dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    # Faces can be rewired without changing the element counts
+    signature = hash((num_verts, edge_verts.tobytes(), loop_edges.tobytes(), loop_verts.tobytes()))
+    cached = mesh_manifold_cache.get(mesh.as_pointer())
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    # Manifold edge is used by exactly two faces
+    face_counts = np.bincount(loop_edges, minlength=num_edges)
+    bad_edges = face_counts != 2
+
+    # Those two faces also need to use the edge in opposite direction
+    order = np.argsort(loop_edges, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(face_counts)[:-1])).astype(np.int64)
+    two = np.flatnonzero(face_counts == 2)
+    first, second = order[starts[two]], order[starts[two] + 1]
+    flipped = loop_verts[first] == loop_verts[second]
+    bad_edges[two[flipped]] = True
+
+    # Loose vertices are also non-manifold
+    bad_verts = np.bincount(edge_verts, minlength=num_verts) == 0
+    bad_verts[edge_verts.reshape(-1, 2)[bad_edges].ravel()] = True
+
+    # Face corners around a vertex are connected through manifold edges, more than one fan means bowtie vertex
+    if num_loops > 0:
+        next_loops = np.arange(1, num_loops + 1, dtype=np.int64)
+        next_loops[loop_starts + loop_totals - 1] = loop_starts
+        first, second = first[~flipped], second[~flipped]
+        links = np.stack((first, next_loops[second], next_loops[first], second), axis=1).ravel()
+        fans, num_fans = get_vertex_islands(num_loops, links)
+        fan_verts = np.unique(loop_verts.astype(np.int64) * num_fans + fans) // num_fans
+        bad_verts[fan_verts[np.flatnonzero(np.diff(fan_verts) == 0)]] = True
+
+    counts = (int(np.count_nonzero(bad_edges)), int(np.count_nonzero(bad_verts)))
+    mesh_manifold_cache[mesh.as_pointer()] = (signature, counts)
+
+    return counts
+
+def get_mesh_basis_coords(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    if mesh.shape_keys: mesh.shape_keys.reference_key.data.foreach_get('co', co)
+    else: mesh.vertices.foreach_get('co', co)
+    return co.reshape(-1, 3)
+
+mesh_symmetry_cache = {}
+
+def get_mesh_symmetry_pairs(mesh, axis=0, tolerance=0.001):
+    from mathutils import kdtree
+
+    num_verts = len(mesh.vertices)
+    co = get_mesh_basis_coords(mesh)
+
+    # Validated by its own signature, since writing shape keys also sends geometry updates
+    signature = (num_verts, axis, tolerance, hash(co.tobytes()))
+    cached = mesh_symmetry_cache.get(mesh.as_pointer())
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    kd = kdtree.KDTree(num_verts)
+    for i, c in enumerate(co.tolist()):
+        kd.insert(c, i)
+    kd.balance()
+
+    mirrored = co.copy()
+    mirrored[:, axis] *= -1
+    found = [kd.find(c) for c in mirrored.tolist()]
+    pairs = np.array([f[1] if f[1] != None and f[2] <= tolerance else -1 for f in found], dtype=np.int64)
+
+    # Pair is only valid if both vertices found each other
+    valid = np.flatnonzero(pairs >= 0)
+    pairs[valid[pairs[pairs[valid]] != valid]] = -1
+
+    mesh_symmetry_cache[mesh.as_pointer()] = (signature, pairs)
+
+    return pairs
+
+def get_mirrored_shape_key_coords(co, rel_co, ref_co, pairs, axis=0, mode='FLIP', direction=1):
+    deltas = co - rel_co
+    paired = np.flatnonzero(pairs >= 0)
+
+    mirrored = deltas[pairs[paired]]
+    mirrored[:, axis] *= -1
+
+    if mode == 'SYMMETRIZE':
+        # Only overwrite the side opposite of the direction
+        side = ref_co[paired, axis] * direction < 0
+        deltas[paired[side]] = mirrored[side]
+
+        # Center vertices can't move across the mirror plane
+        center = paired[pairs[paired] == paired]
+        deltas[center, axis] = 0.0
+    else:
+        # Unpaired vertices have nothing to take their delta from, so they don't move
+        deltas[pairs < 0] = 0.0
+        deltas[paired] = mirrored
+
+    return rel_co + deltas
+
+# Surface mappings per target mesh, only validated by signature of both meshes
+mesh_surface_mapping_cache = {}
+
+def get_mesh_topology_hash(mesh):
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    return hash((len(mesh.vertices), loop_verts.tobytes(), loop_totals.tobytes()))
+
+def get_surface_mapping(target, source):
+    from mathutils.bvhtree import BVHTree
+
+    target_co = get_mesh_basis_coords(target.data)
+    source_co = get_mesh_basis_coords(source.data)
+    mat = np.array(source.matrix_world.inverted() @ target.matrix_world, dtype=np.float32)
+
+    # Validated by topology and basis of both meshes, since writing shape keys also sends geometry updates
+    signature = (source.data.as_pointer(), get_mesh_topology_hash(target.data), get_mesh_topology_hash(source.data), 
+            hash(target_co.tobytes()), hash(source_co.tobytes()), mat.tobytes())
+    cached = mesh_surface_mapping_cache.get(target.data.as_pointer())
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    source.data.calc_loop_triangles()
+    tris = np.empty(len(source.data.loop_triangles) * 3, dtype=np.int32)
+    source.data.loop_triangles.foreach_get('vertices', tris)
+    tris = tris.reshape(-1, 3)
+
+    # Target vertices are mapped in source local space
+    points = target_co @ mat[:3, :3].T + mat[:3, 3]
+
+    bvh = BVHTree.FromPolygons(source_co.tolist(), tris.tolist())
+    found = [bvh.find_nearest(p) for p in points.tolist()]
+    tri_ids = np.array([f[2] if f[2] != None else 0 for f in found], dtype=np.int64)
+    nearest = np.array([f[0] if f[0] != None else (0.0, 0.0, 0.0) for f in found], dtype=np.float64).reshape(-1, 3)
+    distances = np.array([f[3] if f[3] != None else np.inf for f in found], dtype=np.float32)
+
+    # Barycentric weights of nearest points on their triangles
+    vert_ids = tris[tri_ids]
+    a, b, c = (source_co[vert_ids[:, i]].astype(np.float64) for i in range(3))
+    v0, v1, v2 = b - a, c - a, nearest - a
+    d00 = (v0 * v0).sum(axis=1)
+    d01 = (v0 * v1).sum(axis=1)
+    d11 = (v1 * v1).sum(axis=1)
+    d20 = (v2 * v0).sum(axis=1)
+    d21 = (v2 * v1).sum(axis=1)
+    denom = d00 * d11 - d01 * d01
+    degenerate = np.abs(denom) < 1e-20
+    denom[degenerate] = 1.0
+    v = (d11 * d20 - d01 * d21) / denom
+    w = (d00 * d21 - d01 * d20) / denom
+    weights = np.stack((1.0 - v - w, v, w), axis=1)
+
+    # Degenerate triangles just use their first vertex
+    weights[degenerate] = (1.0, 0.0, 0.0)
+
+    mapping = (vert_ids.astype(np.int32), weights.astype(np.float32), distances)
+    mesh_surface_mapping_cache[target.data.as_pointer()] = (signature, mapping)
+
+    return mapping
+
+def get_shape_key_transfer_targets(ids, offsets, users):
+    starts = offsets[ids]
+    counts = offsets[ids + 1] - starts
+    total = int(counts.sum())
+    if total == 0: return np.empty(0, dtype=np.int64)
+
+    # Concatenated ranges of target vertices using the moving source vertices
+    pos = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return np.unique(users[pos])
+
+def transfer_shape_keys(target, source, names, max_distance=0.0):
+    vert_ids, weights, distances = get_surface_mapping(target, source)
+
+    if max_distance > 0.0:
+        weights = weights * (distances <= max_distance)[:, None]
+
+    # Deltas are mapped from source local space to target local space
+    mat = np.array(target.matrix_world.inverted() @ source.matrix_world, dtype=np.float32)[:3, :3]
+
+    if not target.data.shape_keys:
+        target.shape_key_add(name='Basis', from_mix=False)
+
+    index = get_shape_key_sparse_index(source)
+    source_blocks = source.data.shape_keys.key_blocks
+    target_blocks = target.data.shape_keys.key_blocks
+    target_co = get_mesh_basis_coords(target.data)
+    num_source_verts = len(source.data.vertices)
+
+    key_ids = [i for i in (source_blocks.find(name) for name in names) if i > 0]
+    if not key_ids: return []
+
+    # Target vertices using each source vertex, so moving source vertices lead to affected targets directly
+    rows, corners = np.nonzero(weights != 0.0)
+    src_ids = vert_ids[rows, corners]
+    order = np.argsort(src_ids, kind='stable')
+    users = rows[order]
+    offsets = np.zeros(num_source_verts + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src_ids, minlength=num_source_verts), out=offsets[1:])
+
+    # Only target vertices mapped to moving source vertices need to be written
+    created = []
+    transferred = []
+    for i in key_ids:
+        src_kb = source_blocks[i]
+        kb = target_blocks.get(src_kb.name)
+        if kb:
+            kb.data.foreach_set('co', target_co.ravel())
+        else:
+            kb = target.shape_key_add(name=src_kb.name, from_mix=False)
+            kb.slider_min = src_kb.slider_min
+            kb.slider_max = src_kb.slider_max
+            kb.value = src_kb.value
+            if src_kb.vertex_group in target.vertex_groups:
+                kb.vertex_group = src_kb.vertex_group
+            created.append((kb, src_kb))
+
+        # Barycentric gather only on affected target vertices, from sparse deltas of the key
+        ids = get_shape_key_transfer_targets(index.get(i)[0], offsets, users)
+        deltas = index.get_deltas_at(i, vert_ids[ids].ravel()).reshape(-1, 3, 3)
+        deltas = (deltas * weights[ids, :, None]).sum(axis=1) @ mat.T
+        set_shape_key_coords_sparse(kb, ids, target_co[ids] + deltas)
+        transferred.append(kb.name)
+
+    # Relative keys can only be set after all keys are created
+    for kb, src_kb in created:
+        rel_key = target_blocks.get(src_kb.relative_key.name)
+        kb.relative_key = rel_key if rel_key else target_blocks[0]
+
+    target.data.update()
+    invalidate_shape_key_sparse_index(target.data)
+
+    return transferred
+
+# Modifiers changing topology per shape key, validated by shape keys and modifier stack
+modifier_topology_cache = {}
+
+def get_modifier_topology_changes(obj):
+    import hashlib
+
+    # Signature covers all shape key coordinates and settings of every modifier
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr(get_shape_key_sparse_signature(obj)).encode())
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    cacheable = True
+    for mod in obj.modifiers:
+        h.update(repr((mod.name, mod.type, mod.show_viewport)).encode())
+        if not update_hash_with_rna_props(h, mod, depsgraph):
+            cacheable = False
+            break
+    signature = h.hexdigest() if cacheable else None
+
+    cached = modifier_topology_cache.get(obj.data.as_pointer())
+    if signature and cached and cached[0] == signature:
+        return cached[1]
+
+    # Only the basis and the most moving shape key are checked
+    indices = [0, get_shape_key_sparse_index(obj).get_most_moving_index()]
+    changes = {}
+    for mod in obj.modifiers:
+        if mod.type in per_vertex_deform_types or not mod.show_viewport: continue
+        offending, estimate = check_shape_keys_topology(obj, [mod.name], indices)
+        changes[mod.name] = any(offending)
+
+    if signature: modifier_topology_cache[obj.data.as_pointer()] = (signature, changes)
+
+    return changes
+
+def invalidate_mesh_caches(mesh, geometry=True):
+    invalidate_shape_key_sparse_index(mesh)
+    if geometry:
+        mesh_manifold_cache.pop(mesh.as_pointer(), None)
+
+def clear_mesh_caches():
+    shape_key_sparse_cache.clear()
+    mesh_manifold_cache.clear()
+    mesh_symmetry_cache.clear()
+    mesh_surface_mapping_cache.clear()
+    modifier_topology_cache.clear()
+
+def set_shape_key_coords_sparse(kb, ids, co):
+    if len(ids) == 0: return
+
+    # Writing few vertices one by one is faster than writing all of them
+    if len(ids) * 16 < len(kb.data):
+        data = kb.data
+        for i, c in zip(ids.tolist(), co.tolist()):
+            data[i].co = c
+        return
+
+    full = np.empty(len(kb.data) * 3, dtype=np.float32)
+    kb.data.foreach_get('co', full)
+    full = full.reshape(-1, 3)
+    full[ids] = co
+    kb.data.foreach_set('co', full.ravel())
+
+shape_key_attribute_prefix = 'SK-'
+
+def is_shape_key_attribute(attr):
+    return attr.data_type == 'FLOAT_VECTOR' and attr.domain == 'POINT'
+
+def shape_keys_to_attributes(obj, indices):
+    mesh = obj.data
+    key_blocks = mesh.shape_keys.key_blocks
+    index = get_shape_key_sparse_index(obj)
+
+    # Reuse one array, vertices not moved by the key stay zero
+    vectors = np.zeros((len(mesh.vertices), 3), dtype=np.float32)
+    attr_names = []
+
+    for i in indices:
+        attr_name = shape_key_attribute_prefix + key_blocks[i].name
+        attr = mesh.attributes.get(attr_name)
+        if attr and not is_shape_key_attribute(attr):
+            mesh.attributes.remove(attr)
+            attr = None
+        if not attr:
+            attr = mesh.attributes.new(attr_name, 'FLOAT_VECTOR', 'POINT')
+
+        ids, deltas = index.get(i)
+        vectors[ids] = deltas
+        attr.data.foreach_set('vector', vectors.ravel())
+        vectors[ids] = 0.0
+
+        attr_names.append(attr_name)
+
+    return attr_names
+
+def attributes_to_shape_keys(obj, attr_names):
+    mesh = obj.data
+    num_verts = len(mesh.vertices)
+
+    if not mesh.shape_keys:
+        obj.shape_key_add(name='Basis', from_mix=False)
+    key_blocks = mesh.shape_keys.key_blocks
+
+    basis = np.empty(num_verts * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', basis)
+    vectors = np.empty(num_verts * 3, dtype=np.float32)
+
+    key_names = []
+    for attr_name in attr_names:
+        attr = mesh.attributes.get(attr_name)
+        if not attr or not is_shape_key_attribute(attr): continue
+
+        key_name = attr_name[len(shape_key_attribute_prefix):] if attr_name.startswith(shape_key_attribute_prefix) else attr_name
+        kb = key_blocks.get(key_name)
+        if not kb:
+            kb = obj.shape_key_add(name=key_name, from_mix=False)
+
+        attr.data.foreach_get('vector', vectors)
+        kb.data.foreach_set('co', basis + vectors)
+
+        key_names.append(kb.name)
+
+    mesh.update()
+    invalidate_shape_key_sparse_index(mesh)
+
+    return key_names
+
+shape_key_archive_version = 1
+
+def write_shape_key_archive(obj, filepath):
+    import json
+    index = get_shape_key_sparse_index(obj)
+
+    meta = {
+        'version' : shape_key_archive_version,
+        'object' : obj.name,
+        'num_verts' : len(index.basis),
+        'keys' : get_shape_key_props(obj),
+        }
+
+    # Uncompressed so the arrays can be memory mapped directly from the file
+    np.savez(filepath, meta=np.array(json.dumps(meta)), basis=index.basis, offsets=index.offsets, indices=index.indices, deltas=index.deltas)
+
+quantized_morph_version = 1
+
+def quantize_shape_keys(obj, tolerance=1e-4):
+    index = get_shape_key_sparse_index(obj)
+    num_keys = index.num_keys
+    num_verts = len(index.basis)
+
+    counts = index.get_counts()
+    key_ids = np.repeat(np.arange(num_keys), counts)
+    deltas = index.deltas
+    lengths = np.abs(deltas).max(axis=1) if len(deltas) > 0 else np.zeros(0, dtype=np.float32)
+
+    # Vertices that barely move are dropped
+    keep = lengths >= tolerance
+    kept_keys = key_ids[keep]
+
+    # Each key uses its own scale so small keys still get full int16 precision
+    max_abs = np.zeros(num_keys, dtype=np.float64)
+    np.maximum.at(max_abs, kept_keys, lengths[keep])
+    scales = (max_abs / 32767.0).astype(np.float32)
+    scales[scales == 0.0] = 1.0
+
+    quantized = np.round(deltas[keep] / scales[kept_keys, None]).astype(np.int16)
+
+    offsets = np.zeros(num_keys + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(kept_keys, minlength=num_keys))
+
+    # Error of dropped vertices is the delta itself
+    errors = np.linalg.norm(deltas, axis=1) if len(deltas) > 0 else np.zeros(0)
+    errors[keep] = np.linalg.norm(quantized * scales[kept_keys, None] - deltas[keep], axis=1)
+
+    max_errors = np.zeros(num_keys)
+    np.maximum.at(max_errors, key_ids, errors)
+    rms_errors = np.sqrt(np.bincount(key_ids, weights=errors ** 2, minlength=num_keys) / max(num_verts, 1))
+
+    report = {
+        'num_verts' : num_verts,
+        'tolerance' : tolerance,
+        'dense_bytes' : (num_keys - 1) * num_verts * 12,
+        'sparse_bytes' : int(len(deltas) * 16),
+        'quantized_bytes' : int(len(quantized) * 10 + num_keys * 8),
+        'max_error' : float(max_errors.max(initial=0.0)),
+        'keys' : [],
+        }
+
+    key_blocks = obj.data.shape_keys.key_blocks
+    for i in range(1, num_keys):
+        report['keys'].append({
+            'name' : key_blocks[i].name,
+            'verts' : int(offsets[i+1] - offsets[i]),
+            'dropped' : int(counts[i] - (offsets[i+1] - offsets[i])),
+            'scale' : float(scales[i]),
+            'max_error' : float(max_errors[i]),
+            'rms_error' : float(rms_errors[i]),
+            })
+
+    # Reference key is never exported
+    arrays = {
+        'names' : np.array([kb.name for kb in key_blocks[1:]]),
+        'offsets' : (offsets[1:] - offsets[1]).astype(np.uint32),
+        'indices' : index.indices[keep].astype(np.uint32),
+        'deltas' : quantized,
+        'scales' : scales[1:],
+        }
+
+    return arrays, report
+
+def write_quantized_morphs(obj, filepath, tolerance=1e-4, report_filepath=''):
+    import json
+    arrays, report = quantize_shape_keys(obj, tolerance)
+
+    meta = {
+        'version' : quantized_morph_version,
+        'object' : obj.name,
+        'num_verts' : report['num_verts'],
+        }
+
+    np.savez_compressed(filepath, meta=np.array(json.dumps(meta)), **arrays)
 
-    fcurves = []
-    for slot in action.slots:
-        channelbag = anim_utils.action_get_channelbag_for_slot(action, slot)
-        for fc in channelbag.fcurves:
-            fcurves.append(fc)
+    if report_filepath:
+        with open(report_filepath, 'w') as f:
+            json.dump(report, f, indent=2)
 
-    return fcurves
+    return report
 
-def apply_modifiers_with_shape_keys(obj, selectedModifiers, disable_armatures=True):
+def load_npz_mmap(filepath):
+    import zipfile, struct
+    arrays = {}
+
+    with zipfile.ZipFile(filepath) as zf, open(filepath, 'rb') as raw:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+
+            with zf.open(info) as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else: shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                header_size = f.tell()
+
+            # Compressed, object and empty arrays can't be mapped
+            if info.compress_type != zipfile.ZIP_STORED or dtype.hasobject or not shape or 0 in shape:
+                with zf.open(info) as f:
+                    arrays[name] = np.lib.format.read_array(f)
+                continue
+
+            # Data starts after zip local header and npy header
+            raw.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack('<HH', raw.read(4))
+            offset = info.header_offset + 30 + name_len + extra_len + header_size
+
+            arrays[name] = np.memmap(filepath, dtype=dtype, mode='r', shape=shape, offset=offset, order='F' if fortran_order else 'C')
+
+    return arrays
+
+class ShapeKeyArchive(ShapeKeySparseIndex):
+    def __init__(self, filepath):
+        import json
+        arrays = load_npz_mmap(filepath)
+        meta = json.loads(str(arrays['meta']))
+
+        if meta['version'] > shape_key_archive_version:
+            raise ValueError("Shape key archive is made by newer version of this addon!")
+
+        self.filepath = filepath
+        self.keys = meta['keys']
+        self.num_keys = len(self.keys)
+        self.num_verts = meta['num_verts']
+
+        # Only parts of the arrays that are actually used will be read from disk
+        self.basis = arrays['basis']
+        self.offsets = np.array(arrays['offsets'])
+        self.indices = arrays['indices']
+        self.deltas = arrays['deltas']
+
+    def find(self, name):
+        for i, props in enumerate(self.keys):
+            if props['name'] == name: return i
+        return -1
+
+def import_shape_key_archive(obj, archive, names):
+    mesh = obj.data
+    num_verts = len(mesh.vertices)
+
+    if num_verts != archive.num_verts:
+        return ([], "Archive has %d vertices but '%s' has %d vertices!" % (archive.num_verts, obj.name, num_verts))
+
+    if not mesh.shape_keys:
+        obj.shape_key_add(name='Basis', from_mix=False)
+    key_blocks = mesh.shape_keys.key_blocks
+
+    # Deltas are added to current basis of the object
+    basis = np.empty(num_verts * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', basis)
+    basis = basis.reshape(num_verts, 3)
+    co = np.empty((num_verts, 3), dtype=np.float32)
+
+    imported = []
+    for name in names:
+        i = archive.find(name)
+
+        # Reference key is never replaced
+        if i <= 0: continue
+
+        ids, deltas = archive.get(i)
+        co[:] = basis
+        co[ids] += deltas
+
+        kb = key_blocks.get(name)
+        if not kb:
+            kb = obj.shape_key_add(name=name, from_mix=False)
+        kb.data.foreach_set('co', co.ravel())
+
+        imported.append((kb, archive.keys[i]))
+
+    # Set properties after all keys are created so relative keys can be found
+    for kb, props in imported:
+        kb.interpolation = props['interpolation']
+        kb.mute = props['mute']
+        kb.slider_max = props['slider_max']
+        kb.slider_min = props['slider_min']
+        kb.value = props['value']
+        kb.vertex_group = props['vertex_group']
+
+        rel_key = key_blocks.get(props['relative_key'])
+        if rel_key: kb.relative_key = rel_key
+
+    mesh.update()
+    invalidate_shape_key_sparse_index(mesh)
+
+    return ([kb.name for kb, props in imported], None)
+
+def get_vertex_group_weights_by_attributes(obj):
+    num_verts = len(obj.data.vertices)
+    names = ['yetc_vertex_group_%d' % i for i in range(len(obj.vertex_groups))]
+
+    # Geometry nodes store every vertex group as float attribute, which can be read all at once
+    ng = bpy.data.node_groups.new('__yetc_vertex_group_weights', 'GeometryNodeTree')
+    tmpObject = None
+    try:
+        ng.interface.new_socket('Geometry', in_out='INPUT', socket_type='NodeSocketGeometry')
+        ng.interface.new_socket('Geometry', in_out='OUTPUT', socket_type='NodeSocketGeometry')
+        socket = ng.nodes.new('NodeGroupInput').outputs[0]
+        for vg, name in zip(obj.vertex_groups, names):
+            read = ng.nodes.new('GeometryNodeInputNamedAttribute')
+            read.data_type = 'FLOAT'
+            read.inputs['Name'].default_value = vg.name
+            store = ng.nodes.new('GeometryNodeStoreNamedAttribute')
+            store.data_type = 'FLOAT'
+            store.domain = 'POINT'
+            store.inputs['Name'].default_value = name
+            value_in = [i for i in store.inputs if i.name == 'Value' and i.enabled][0]
+            value_out = [o for o in read.outputs if o.name == 'Attribute' and o.enabled][0]
+            ng.links.new(socket, store.inputs['Geometry'])
+            ng.links.new(value_out, value_in)
+            socket = store.outputs['Geometry']
+        ng.links.new(socket, ng.nodes.new('NodeGroupOutput').inputs[0])
+
+        # Temporary object without other modifiers, vertex group names are stored in mesh data
+        tmpObject = bpy.data.objects.new('__yetc_vertex_group_weights', obj.data)
+        bpy.context.scene.collection.objects.link(tmpObject)
+        tmpObject.modifiers.new('Weights', 'NODES').node_group = ng
+
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        obj_eval = tmpObject.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+
+        vert_ids = []
+        group_ids = []
+        weights = []
+        arr = np.empty(num_verts, dtype=np.float32)
+        for i, name in enumerate(names):
+            mesh.attributes[name].data.foreach_get('value', arr)
+            ids = np.flatnonzero(arr)
+            vert_ids.append(ids)
+            group_ids.append(np.full(len(ids), i, dtype=np.int64))
+            weights.append(arr[ids].astype(np.float64))
+        obj_eval.to_mesh_clear()
+
+    finally:
+        if tmpObject: bpy.data.objects.remove(tmpObject, do_unlink=True)
+        bpy.data.node_groups.remove(ng)
+
+    vert_ids = np.concatenate(vert_ids).astype(np.int64)
+    group_ids = np.concatenate(group_ids)
+    weights = np.concatenate(weights)
+
+    # Same order as reading groups of each vertex
+    order = np.lexsort((group_ids, vert_ids))
+
+    return vert_ids[order], group_ids[order], weights[order]
+
+def get_vertex_group_weights(obj):
+    verts = obj.data.vertices
+
+    if len(obj.vertex_groups) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    # Vertex groups have no bulk access, attributes do, zero weights are left out that way
+    if is_bl_newer_than(4) and obj.mode == 'OBJECT':
+        try: return get_vertex_group_weights_by_attributes(obj)
+        except Exception as e: print("get_vertex_group_weights: Falling back to read weights per vertex, " + str(e))
+
+    counts = np.fromiter((len(v.groups) for v in verts), dtype=np.int64, count=len(verts))
+    total = int(counts.sum())
+    group_ids = np.empty(total, dtype=np.int32)
+    weights = np.empty(total, dtype=np.float32)
+
+    # Groups of each vertex are read at once rather than element by element
+    start = 0
+    for v, count in zip(verts, counts.tolist()):
+        if count == 0: continue
+        end = start + count
+        v.groups.foreach_get('group', group_ids[start:end])
+        v.groups.foreach_get('weight', weights[start:end])
+        start = end
+
+    vert_ids = np.repeat(np.arange(len(verts), dtype=np.int64), counts)
+
+    return vert_ids, group_ids.astype(np.int64), weights.astype(np.float64)
+
+def get_side_split_weights(ref_co, axis=0, width=0.0):
+    x = ref_co[:, axis].astype(np.float64)
+
+    # Smoothstep blend across the mirror plane, hard split if there's no width
+    if width > 0.0:
+        t = np.clip(x / width + 0.5, 0.0, 1.0)
+        t = t * t * (3.0 - 2.0 * t)
+    else: t = np.where(x > 0.0, 1.0, np.where(x < 0.0, 0.0, 0.5))
+
+    return np.stack((t, 1.0 - t))
+
+def get_vertex_group_split_weights(obj, group_indices):
+    vert_ids, group_ids, group_weights = get_vertex_group_weights(obj)
+
+    weights = np.zeros((len(group_indices), len(obj.data.vertices)))
+    for i, index in enumerate(group_indices):
+        m = group_ids == index
+        weights[i, vert_ids[m]] = group_weights[m]
+
+    # Overlapping groups are normalized so they won't add up more than the original
+    weights /= np.maximum(weights.sum(axis=0), 1.0)
+
+    return weights
+
+def split_shape_key_deltas(deltas, weights):
+    splits = weights[:, :, None].astype(np.float32) * deltas[None]
+
+    # Remainder makes all splits add up back to the original deltas
+    remainder = deltas - splits.sum(axis=0)
+
+    return splits, remainder
+
+def is_armature_deform_linear(mod):
+    # Envelopes, preserve volume and b-bones makes the deformation depends on vertex position
+    if mod.type != 'ARMATURE' or not mod.object or mod.object.type != 'ARMATURE': return False
+    if not mod.use_vertex_groups or mod.use_bone_envelopes: return False
+    if mod.use_deform_preserve_volume or mod.use_multi_modifier: return False
+
+    for bone in mod.object.data.bones:
+        if bone.use_deform and bone.bbone_segments > 1:
+            return False
+
+    return True
+
+def get_armature_deform_matrices(obj, mod, depsgraph, weights=None):
+
+    rig_eval = mod.object.evaluated_get(depsgraph)
+    obj_eval = obj.evaluated_get(depsgraph)
+    num_verts = len(obj.data.vertices)
+
+    if weights == None:
+        weights = get_vertex_group_weights(obj)
+    vert_ids, group_ids, group_weights = weights
+
+    # Deform matrix for each vertex group in armature space
+    group_mats = np.zeros((max(len(obj.vertex_groups), 1), 4, 4))
+    use_groups = np.zeros(len(group_mats), dtype=bool)
+    rest_position = rig_eval.data.pose_position == 'REST'
+    for vg in obj.vertex_groups:
+        pbone = rig_eval.pose.bones.get(vg.name)
+        if not pbone or not pbone.bone.use_deform: continue
+        if rest_position:
+            group_mats[vg.index] = np.identity(4)
+        else: group_mats[vg.index] = np.array(pbone.matrix @ pbone.bone.matrix_local.inverted())
+        use_groups[vg.index] = True
+
+    # Blend all deform matrices by normalized weights
+    mask = use_groups[group_ids] & (group_weights != 0.0)
+    v = vert_ids[mask]
+    g = group_ids[mask]
+    w = group_weights[mask]
+
+    contrib = np.bincount(v, weights=w, minlength=num_verts)
+    flat_mats = group_mats.reshape(-1, 16)
+    blend = np.empty((num_verts, 16))
+    for c in range(16):
+        blend[:, c] = np.bincount(v, weights=w * flat_mats[g, c], minlength=num_verts)
+    blend = blend.reshape(-1, 4, 4)
+
+    # Modifier vertex group works as deform factor
+    factors = np.ones(num_verts)
+    vg = obj.vertex_groups.get(mod.vertex_group) if mod.vertex_group != '' else None
+    if vg:
+        factors = np.zeros(num_verts)
+        m = group_ids == vg.index
+        factors[vert_ids[m]] = group_weights[m]
+        if mod.invert_vertex_group:
+            factors = 1.0 - factors
+
+    identity = np.identity(4)
+    mats = np.broadcast_to(identity, (num_verts, 4, 4)).copy()
+    valid = contrib > 0.0001
+    mats[valid] += factors[valid, None, None] * (blend[valid] / contrib[valid, None, None] - identity)
+
+    # Convert from armature space to object space
+    premat = np.array(rig_eval.matrix_world.inverted() @ obj_eval.matrix_world)
+    postmat = np.linalg.inv(premat)
+
+    return np.matmul(postmat, np.matmul(mats, premat))
+
+def get_corrective_shape_key_deltas(obj, target):
+
+    mods = [m for m in obj.modifiers if m.type == 'ARMATURE' and m.show_viewport and m.object and m.object.type == 'ARMATURE']
+    if not mods:
+        return None, "Object '" + obj.name + "' has no armature modifier!"
+
+    # Posed mesh is evaluated without modifiers after the last armature so the vertices still match
+    last = max(obj.modifiers.find(m.name) for m in mods)
+    hidden = [m for m in obj.modifiers[last+1:] if m.show_viewport]
+    for m in hidden:
+        m.show_viewport = False
+
+    try:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        posed_co = get_evaluated_vertex_coords(obj, depsgraph)
+        sculpt_co = get_evaluated_vertex_coords(target, depsgraph)
+
+        # Stacked linear deforms can be combined into one matrix per vertex
+        weights = get_vertex_group_weights(obj)
+        mats = np.identity(4)
+        for m in mods:
+            mats = np.matmul(get_armature_deform_matrices(obj, m, depsgraph, weights), mats)
+    finally:
+        for m in hidden:
+            m.show_viewport = True
+
+    num_verts = len(obj.data.vertices)
+    if len(posed_co) != num_verts:
+        return None, "Modifiers before the armature of '" + obj.name + "' change the vertex count!"
+    if len(sculpt_co) != num_verts:
+        return None, "Vertex count of '" + target.name + "' doesn't match '" + obj.name + "'!"
+
+    # Sculpted target can be placed anywhere
+    if target.matrix_world != obj.matrix_world:
+        mat = np.array(obj.matrix_world.inverted() @ target.matrix_world, dtype=np.float32)
+        sculpt_co = sculpt_co @ mat[:3, :3].T + mat[:3, 3]
+
+    # Only rotation and scale matter for the delta, vertices with degenerate matrix are left as is
+    rot = mats[:, :3, :3]
+    valid = np.abs(np.linalg.det(rot)) > 1e-8
+    deltas = sculpt_co - posed_co
+    deltas[valid] = np.matmul(np.linalg.inv(rot[valid]), deltas[valid, :, None])[..., 0]
+
+    if not all(is_armature_deform_linear(m) for m in mods):
+        print("get_corrective_shape_key_deltas: Armature deform is not linear, the result is an approximation")
+
+    return deltas.astype(np.float32), None
+
+def transform_coords_by_matrices(coords, mats):
+    rot = mats[:, :3, :3].astype(np.float32)
+    loc = mats[:, :3, 3].astype(np.float32)
+
+    return np.matmul(rot, coords[..., None])[..., 0] + loc
+
+def set_reference_key_coords(obj, co):
+    obj.data.shape_keys.key_blocks[0].data.foreach_set('co', co.ravel())
+    obj.update_tag(refresh={'DATA'})
+
+def get_modifiers_deform_jacobians(obj, selectedModifiers, basis_co):
+
+    extent = float(np.ptp(basis_co, axis=0).max()) if len(basis_co) > 0 else 1.0
+    eps = 1e-3 * max(extent, 1e-3)
+
+    jacobians = np.empty((len(basis_co), 3, 3), dtype=np.float32)
+
+    state = set_shape_key_eval_state(obj, selectedModifiers)
+    obj.active_shape_key_index = 0
+
+    try:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        base_co = get_evaluated_vertex_coords(obj, depsgraph)
+
+        # Central differences by moving all vertices at once along each axis
+        for axis in range(3):
+            offset_cos = []
+            for sign in (1.0, -1.0):
+                co = basis_co.copy()
+                co[:, axis] += sign * eps
+                set_reference_key_coords(obj, co)
+                depsgraph = bpy.context.evaluated_depsgraph_get()
+                offset_cos.append(get_evaluated_vertex_coords(obj, depsgraph))
+
+            jacobians[:, :, axis] = (offset_cos[0] - offset_cos[1]) / (2.0 * eps)
+
+    finally:
+        set_reference_key_coords(obj, basis_co)
+        recover_shape_key_eval_state(obj, state)
+
+    return base_co, jacobians
+
+def get_shape_keys_deformed_coords(obj, selectedModifiers, tolerance=1e-4, weights=None):
+
+    mods = [obj.modifiers.get(name) for name in selectedModifiers]
+    if not mods or any(not m or not m.show_viewport or m.type not in per_vertex_deform_types for m in mods):
+        return None
+
+    # Most shape keys only move few vertices, the rest is just deformed basis
+    index = get_shape_key_sparse_index(obj)
+    basis_co = index.basis
+    shapesCount = index.num_keys
+
+    if all(is_armature_deform_linear(m) for m in mods):
+        print("apply_modifiers_with_shape_keys: Using armature deform matrices")
+
+        # Stacked linear deforms can be combined into one matrix per vertex
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        if weights == None:
+            weights = get_vertex_group_weights(obj)
+        mats = np.identity(4)
+        for m in mods:
+            mats = np.matmul(get_armature_deform_matrices(obj, m, depsgraph, weights), mats)
+
+        coords = np.repeat(transform_coords_by_matrices(basis_co, mats)[None], shapesCount, axis=0)
+        for i in range(1, shapesCount):
+            ids, deltas = index.get(i)
+            if len(ids) == 0: continue
+            coords[i, ids] = transform_coords_by_matrices(basis_co[ids] + deltas, mats[ids])
+
+    else:
+        # Evaluating the jacobians costs 7 evaluations including the verification
+        if shapesCount < 9: return None
+
+        print("apply_modifiers_with_shape_keys: Using deform jacobians")
+
+        base_co, jacobians = get_modifiers_deform_jacobians(obj, selectedModifiers, basis_co)
+        coords = np.repeat(base_co[None], shapesCount, axis=0)
+        for i in range(1, shapesCount):
+            ids, deltas = index.get(i)
+            if len(ids) == 0: continue
+            coords[i, ids] = base_co[ids] + np.matmul(jacobians[ids], deltas[..., None])[..., 0]
+
+    # Verify result using the shape key that moves the most
+    if shapesCount > 1:
+        worst = index.get_most_moving_index()
+
+        evaluated, errorInfo = get_shape_keys_evaluated_coords(obj, selectedModifiers, [worst])
+        if errorInfo: return None
+
+        extent = float(np.ptp(basis_co, axis=0).max()) if len(basis_co) > 0 else 1.0
+        error = float(np.abs(evaluated[0] - coords[worst]).max()) if len(basis_co) > 0 else 0.0
+        if error > tolerance * max(extent, 1.0):
+            print("apply_modifiers_with_shape_keys: Deform fast path is not accurate enough (error %g), evaluating all shape keys" % error)
+            return None
+
+    return coords
+
+class ShapeKeysEvalCache:
+    def __init__(self, budget=256 * 1024 * 1024):
+        self.entries = OrderedDict()
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        coords = self.entries.get(key)
+        if coords is None:
+            self.misses += 1
+            return None
+
+        # Most recently used is always at the end
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return coords
+
+    def put(self, key, coords):
+        if key in self.entries:
+            self.size -= self.entries.pop(key).nbytes
+
+        # Results bigger than the whole budget are not worth keeping
+        if coords.nbytes > self.budget: return
+
+        self.entries[key] = coords
+        self.size += coords.nbytes
+        self.evict()
+
+    def evict(self):
+        while self.entries and self.size > self.budget:
+            key, coords = self.entries.popitem(last=False)
+            self.size -= coords.nbytes
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.evict()
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_summary(self):
+        return "%d entries, %0.1f MB, %d hits, %d misses" % (len(self.entries), self.size / (1024 * 1024), self.hits, self.misses)
+
+shape_keys_eval_cache = ShapeKeysEvalCache()
+
+def update_hash_with_id_data(h, id, depsgraph):
+
+    # Collection operand depends on all of its objects
+    if isinstance(id, bpy.types.Collection):
+        h.update(repr(('COLLECTION', id.name)).encode())
+        for o in id.all_objects:
+            if not update_hash_with_id_data(h, o, depsgraph):
+                return False
+        return True
+
+    # Contents of node trees, textures, and other data can't be hashed cheaply
+    if not isinstance(id, bpy.types.Object):
+        return False
+
+    h.update(repr(('OBJECT', id.name, id.type)).encode())
+    h.update(np.array(id.matrix_world, dtype=np.float32).tobytes())
+
+    if id.type == 'ARMATURE':
+        # Vertex groups are matched by bone names, deformation comes from pose relative to rest
+        for pb in id.pose.bones:
+            h.update(pb.name.encode())
+            h.update(np.array(pb.matrix, dtype=np.float32).tobytes())
+            h.update(np.array(pb.bone.matrix_local, dtype=np.float32).tobytes())
+        h.update(id.data.pose_position.encode())
+
+    elif id.type == 'LATTICE':
+        points = id.evaluated_get(depsgraph).data.points
+        co = np.empty(len(points) * 3, dtype=np.float32)
+        points.foreach_get('co_deform', co)
+        h.update(co.tobytes())
+
+    elif id.type in {'MESH', 'CURVE', 'SURFACE', 'FONT'}:
+
+        # Tilt and radius are also used by curve modifier
+        if id.type == 'CURVE':
+            for spline in id.data.splines:
+                for points in (spline.points, spline.bezier_points):
+                    for attr in ('tilt', 'radius'):
+                        arr = np.empty(len(points), dtype=np.float32)
+                        points.foreach_get(attr, arr)
+                        h.update(arr.tobytes())
+
+        obj_eval = id.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+        if mesh:
+            co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', co)
+            loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get('vertex_index', loop_verts)
+            h.update(co.tobytes())
+            h.update(loop_verts.tobytes())
+        obj_eval.to_mesh_clear()
+
+    elif id.type != 'EMPTY':
+        return False
+
+    return True
+
+def update_hash_with_rna_props(h, source, depsgraph):
+    for prop in source.bl_rna.properties:
+        if prop.identifier in {'rna_type', 'name', 'show_expanded', 'is_override_data_local'}: continue
+        if prop.type == 'COLLECTION': continue
+
+        val = getattr(source, prop.identifier, None)
+
+        if prop.type == 'POINTER':
+            if not isinstance(val, bpy.types.ID):
+                continue
+            h.update(repr((prop.identifier, val.name)).encode())
+
+            # Content of other data also affects the result
+            if not update_hash_with_id_data(h, val, depsgraph):
+                return False
+            continue
+
+        if prop.type in {'BOOLEAN', 'INT', 'FLOAT'} and getattr(prop, 'is_array', False):
+            val = tuple(val)
+
+        h.update(repr((prop.identifier, val)).encode())
+
+    # Geometry nodes inputs are stored as ID properties
+    for key in source.keys():
+        val = source[key]
+        if isinstance(val, bpy.types.ID):
+            h.update(repr((key, val.name)).encode())
+            if not update_hash_with_id_data(h, val, depsgraph):
+                return False
+            continue
+        if hasattr(val, 'to_dict'): val = val.to_dict()
+        elif hasattr(val, 'to_list'): val = val.to_list()
+        h.update(repr((key, val)).encode())
+
+    return True
+
+def get_shape_keys_cache_key(obj, selectedModifiers, weights=None):
+    import hashlib
+    h = hashlib.blake2b(digest_size=20)
+
+    # Raw coordinates of all shape keys
+    key_blocks = obj.data.shape_keys.key_blocks
+    co = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+    for kb in key_blocks:
+        kb.data.foreach_get('co', co)
+        h.update(co.tobytes())
+    h.update(repr([(kb.name, kb.relative_key.name) for kb in key_blocks]).encode())
+
+    # Vertex groups and topology can be used by the modifiers, groups are referenced by name
+    if weights == None:
+        weights = get_vertex_group_weights(obj)
+    for arr in weights:
+        h.update(arr.tobytes())
+    h.update(repr([vg.name for vg in obj.vertex_groups]).encode())
+    edges = np.empty(len(obj.data.edges) * 2, dtype=np.int32)
+    obj.data.edges.foreach_get('vertices', edges)
+    h.update(edges.tobytes())
+
+    h.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+    h.update(str(bpy.context.scene.frame_current).encode())
+
+    # Serialized settings of selected modifiers, result is not cached if they use data that can't be hashed
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    for name in selectedModifiers:
+        mod = obj.modifiers.get(name)
+        if not mod: continue
+        h.update(repr((mod.name, mod.type)).encode())
+        if not update_hash_with_rna_props(h, mod, depsgraph):
+            return None
+
+    return h.hexdigest()
+
+def get_applied_base_mesh(obj, selectedModifiers, vertCount):
+
+    view_layer = bpy.context.view_layer
+    ori_active = view_layer.objects.active
+
+    # Modifiers are applied on a temporary copy, so failed apply doesn't leave the object half applied
+    tmpObject = obj.copy()
+    tmpObject.data = obj.data.copy()
+    bpy.context.scene.collection.objects.link(tmpObject)
+    view_layer.objects.active = tmpObject
+
+    errorInfo = None
+    try:
+        tmpObject.shape_key_clear()
+        for modifierName in selectedModifiers:
+            bpy.ops.object.modifier_apply(modifier=modifierName)
+        if len(tmpObject.data.vertices) != vertCount:
+            errorInfo = "Applied modifiers ended up with different number of vertices than evaluated shape keys!"
+    except Exception as e:
+        errorInfo = "Failed to apply modifiers: " + str(e)
+
+    mesh = tmpObject.data
+    bpy.data.objects.remove(tmpObject, do_unlink=True)
+    view_layer.objects.active = ori_active
+
+    if errorInfo:
+        bpy.data.meshes.remove(mesh)
+        return None, errorInfo
+
+    return mesh, None
+
+def apply_modifiers_with_shape_keys_by_data(obj, selectedModifiers, disable_armatures=True, use_deform_fast_path=True, num_workers=0, use_cache=True, stats=None):
+
+    # Just like legacy method, armatures which are not applied still deform shape keys unless disabled
+    evalModifiers = list(selectedModifiers)
+    if not disable_armatures:
+        evalModifiers += [m.name for m in obj.modifiers if m.name not in selectedModifiers and m.type == 'ARMATURE' and m.show_viewport]
+
+    # Repeated apply with unchanged inputs can reuse previous result
+    coords = None
+    cacheKey = None
+    cacheHit = False
+    weights = None
+    if use_cache and shape_keys_eval_cache.budget > 0:
+        stageTime = time.time()
+
+        # Vertex group weights are read once for both cache key and deform fast path
+        weights = get_vertex_group_weights(obj)
+        cacheKey = get_shape_keys_cache_key(obj, evalModifiers, weights)
+        if cacheKey: coords = shape_keys_eval_cache.get(cacheKey)
+        cacheHit = coords is not None
+        if stats:
+            stats.add_stage_time('cache', stageTime)
+            if cacheHit: stats.set_method('cache')
+
+    # Deform only modifiers never change topology, check the others before doing anything
+    mods = [obj.modifiers.get(name) for name in selectedModifiers]
+    if coords is None and any(m and m.type not in per_vertex_deform_types for m in mods):
+        stageTime = time.time()
+        offending, estimate = check_shape_keys_topology(obj, selectedModifiers)
+        if stats: stats.add_stage_time('preflight', stageTime)
+        if offending: return (False, get_topology_error_info(offending, estimate))
+
+    # Evaluate all shape keys first, nothing is changed until all of them are evaluated
+    stageTime = time.time()
+    list_properties = get_shape_key_props(obj)
+    ori_action_name, ori_fcurves = save_shape_key_fcurves(obj)
+    originalIndex = obj.active_shape_key_index
+    if stats: stats.add_stage_time('snapshot', stageTime)
+
+    # Deform only modifiers can be evaluated once for all shape keys
+    if coords is None and use_deform_fast_path:
+        stageTime = time.time()
+        coords = get_shape_keys_deformed_coords(obj, evalModifiers, weights=weights)
+        if stats:
+            stats.add_stage_time('deform', stageTime)
+            if coords is not None: stats.set_method('deform')
+
+    # Evaluate shape keys in background Blender processes
+    if coords is None and num_workers > 1:
+        stageTime = time.time()
+        coords, errorInfo = get_shape_keys_evaluated_coords_by_workers(obj, evalModifiers, num_workers, stats)
+        if errorInfo:
+            print("apply_modifiers_with_shape_keys: " + errorInfo)
+            print("apply_modifiers_with_shape_keys: Falling back to evaluate shape keys in this process")
+        if stats:
+            stats.add_stage_time('workers', stageTime)
+            if coords is not None: stats.set_method('workers')
+
+    if coords is None:
+        stageTime = time.time()
+        if stats: stats.set_method('evaluate')
+
+        # Shape keys that don't move any vertex will be the same as evaluated basis
+        counts = get_shape_key_sparse_index(obj).get_counts()
+        moving = [i for i in range(len(counts)) if i == 0 or counts[i] > 0]
+
+        coords, errorInfo = get_shape_keys_evaluated_coords(obj, evalModifiers, moving, stats=stats)
+        if stats: stats.add_stage_time('evaluate', stageTime)
+        if errorInfo: return (False, errorInfo)
+
+        if len(moving) < len(counts):
+            full = np.repeat(coords[:1], len(counts), axis=0)
+            full[moving] = coords
+            coords = full
+
+    if cacheKey and not cacheHit:
+        coords.flags.writeable = False
+        shape_keys_eval_cache.put(cacheKey, coords)
+
+    # Handle base shape
+    print("apply_modifiers_with_shape_keys: Applying base shape key")
+    stageTime = time.time()
+    mesh, errorInfo = get_applied_base_mesh(obj, selectedModifiers, coords.shape[1])
+    if stats: stats.add_stage_time('base_apply', stageTime)
+    if errorInfo: return (False, errorInfo)
+
+    # Original object is only touched after base shape is known to be fine
+    ori_mesh = obj.data
+    ori_name = ori_mesh.name
+    obj.data = mesh
+    if ori_mesh.users == 0:
+        bpy.data.meshes.remove(ori_mesh)
+        mesh.name = ori_name
+    for modifierName in selectedModifiers:
+        mod = obj.modifiers.get(modifierName)
+        if mod: obj.modifiers.remove(mod)
+
+    # Write shape keys directly into new key blocks
+    stageTime = time.time()
+    for i, props in enumerate(list_properties):
+        key_b = obj.shape_key_add(name=props["name"], from_mix=False)
+        if i == 0: continue
+        key_b.data.foreach_set('co', coords[i].ravel())
+
+    set_shape_key_props(obj, list_properties)
+    obj.data.update()
+    invalidate_shape_key_sparse_index(obj.data)
+
+    obj.active_shape_key_index = originalIndex
+    if stats: stats.add_stage_time('join', stageTime)
+
+    # Recover animation data
+    stageTime = time.time()
+    recover_shape_key_fcurves(obj, ori_action_name, ori_fcurves)
+    if stats: stats.add_stage_time('animation_restore', stageTime)
+
+    return (True, None)
+
+def get_shared_apply_signature(obj, steps, depsgraph):
+    import hashlib
+    h = hashlib.blake2b(digest_size=20)
+
+    # Applied steps, whole modifier stack, transform, and vertex group names decide the result
+    h.update(repr(steps).encode())
+    h.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+    h.update(repr([vg.name for vg in obj.vertex_groups]).encode())
+    for mod in obj.modifiers:
+        h.update(repr((mod.name, mod.type)).encode())
+        if not update_hash_with_rna_props(h, mod, depsgraph):
+            return None
+
+    return h.hexdigest()
+
+def apply_modifiers_with_shape_keys_batch(items, disable_armatures=True, use_legacy=False, use_deform_fast_path=True, make_single_user=True, num_workers=0, use_cache=True, stats=None):
+
+    view_layer = bpy.context.view_layer
+
+    # Cache budget is stored in scene, in megabytes
+    scene_props = getattr(bpy.context.scene, 'yetc', None)
+    if scene_props:
+        shape_keys_eval_cache.set_budget(scene_props.shape_key_cache_budget * 1024 * 1024)
+
+    # Stats is always collected, progress is reported through it
+    if stats == None:
+        stats = ApplyModifiersStats()
+    stats.begin(len(items))
+
+    # Remember original state once for the whole batch
+    ori_active = view_layer.objects.active
+    ori_mode = ori_active.mode if ori_active else 'OBJECT'
+    ori_selected_objs = set(o for o in view_layer.objects if o.select_get())
+
+    if ori_mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    # Item can override armature option as third element
+    items = [(item[0], item[1], item[2] if len(item) > 2 else disable_armatures) for item in items]
+
+    # Group objects sharing the same mesh data
+    data_users = {}
+    for obj, selectedModifiers, itemDisableArmatures in items:
+        if obj.type != 'MESH': continue
+        users = data_users.setdefault(obj.data, [])
+        if obj not in users: users.append(obj)
+
+    # Objects sharing data with the same modifiers will end up the same,
+    # so only the first one is applied and the others will share its result
+    followers = {}
+    ori_meshes = []
+    if make_single_user:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        steps = {}
+        for obj, selectedModifiers, itemDisableArmatures in items:
+            steps.setdefault(obj, []).append((tuple(selectedModifiers), itemDisableArmatures))
+
+        for mesh, objs in data_users.items():
+            leaders = {}
+            for o in objs if len(objs) > 1 else []:
+                sig = get_shared_apply_signature(o, steps[o], depsgraph)
+                if sig and sig in leaders: followers[o] = leaders[sig]
+                elif sig: leaders[sig] = o
+
+            # Multi user data can't be applied, so each leading object gets its own data
+            if mesh.users - int(mesh.use_fake_user) > 1:
+                for o in objs:
+                    if o not in followers: o.data = mesh.copy()
+                ori_meshes.append((mesh, objs[0]))
+
+    results = []
+    leader_results = {}
+    try:
+        for obj, selectedModifiers, itemDisableArmatures in items:
+
+            # Followers are done after their leading object
+            if obj in followers:
+                results.append(None)
+                continue
+
+            startTime = time.time()
+            stats.new_record(obj, selectedModifiers)
+
+            if obj.type != 'MESH':
+                results.append((False, "'" + obj.name + "' is not a mesh object!"))
+                stats.end_record(results[-1], startTime)
+                continue
+
+            if not selectedModifiers:
+                results.append((True, None))
+                leader_results.setdefault(obj, []).append(results[-1])
+                stats.end_record(results[-1], startTime)
+                continue
+
+            view_layer.objects.active = obj
+
+            # Hidden object won't be evaluated
+            originalHide = obj.hide_get()
+            obj.hide_set(False)
+
+            # Unexpected error is raised after object is brought back, failed apply doesn't change the object
+            try:
+                if use_legacy:
+                    stats.set_method('legacy')
+                    result = apply_modifiers_with_shape_keys_by_ops(obj, selectedModifiers, itemDisableArmatures)
+                elif not obj.data.shape_keys or len(obj.data.shape_keys.key_blocks) == 0:
+                    stats.set_method('no_shape_keys')
+                    for modifierName in selectedModifiers:
+                        try: bpy.ops.object.modifier_apply(modifier=modifierName)
+                        except Exception as e: print(e)
+                    result = (True, None)
+                else:
+                    result = apply_modifiers_with_shape_keys_by_data(obj, selectedModifiers, itemDisableArmatures, use_deform_fast_path, num_workers, use_cache, stats)
+            finally:
+                obj.hide_set(originalHide)
+
+            if not result[0]:
+                print("apply_modifiers_with_shape_keys: Failed on '%s': %s" % (obj.name, result[1]))
+
+            results.append(result)
+            leader_results.setdefault(obj, []).append(result)
+            stats.end_record(result, startTime)
+
+        # Followers get the same data, and modifiers applied on their leader are removed
+        follower_steps = {}
+        for i, (obj, selectedModifiers, itemDisableArmatures) in enumerate(items):
+            if obj not in followers: continue
+
+            startTime = time.time()
+            stats.new_record(obj, selectedModifiers)
+            stats.set_method('shared')
+
+            step = follower_steps.get(obj, 0)
+            follower_steps[obj] = step + 1
+            result = leader_results[followers[obj]][step]
+            if result[0]:
+                for modifierName in selectedModifiers:
+                    mod = obj.modifiers.get(modifierName)
+                    if mod: obj.modifiers.remove(mod)
+
+            results[i] = result
+            stats.end_record(result, startTime)
+
+        for obj, leader in followers.items():
+            obj.data = leader.data
+
+        # Original data can be removed if all of its users got the new one
+        for mesh, first_obj in ori_meshes:
+            if mesh.users == 0:
+                name = mesh.name
+                bpy.data.meshes.remove(mesh)
+                first_obj.data.name = name
+
+    finally:
+
+        # Recover selected objects and active object, callers expect to stay in object mode
+        for o in view_layer.objects:
+            sel = o in ori_selected_objs
+            if o.select_get() != sel: o.select_set(sel)
+
+        view_layer.objects.active = ori_active
+
+        stats.end()
+
+    print("apply_modifiers_with_shape_keys: Done in %0.2f seconds\n%s" % (stats.total_time, stats.get_summary()))
+    if use_cache: print("apply_modifiers_with_shape_keys: Cache " + shape_keys_eval_cache.get_summary())
+
+    return results
+
+def apply_modifiers_with_shape_keys(obj, selectedModifiers, disable_armatures=True, use_legacy=False, use_deform_fast_path=True, num_workers=0, use_cache=True, stats=None):
+    return apply_modifiers_with_shape_keys_batch([(obj, selectedModifiers)], disable_armatures, use_legacy, use_deform_fast_path, make_single_user=False, num_workers=num_workers, use_cache=use_cache, stats=stats)[0]
+
+def apply_modifiers_with_shape_keys_by_ops(obj, selectedModifiers, disable_armatures=True):
 
-    list_properties = []
-    properties = ["interpolation", "mute", "name", "relative_key", "slider_max", "slider_min", "value", "vertex_group"]
     shapesCount = 0
     vertCount = -1
     startTime = time.time()
@@ -135,6 +2322,15 @@ def apply_modifiers_with_shape_keys(obj, selectedModifiers, disable_armatures=Tr
         view_layer.objects.active = ori_active
         return (True, None)
 
+    # Check topology before creating any temporary object
+    offending, estimate = check_shape_keys_topology(obj, selectedModifiers)
+    if offending:
+        if disable_armatures:
+            for modifier in disabled_armature_modifiers:
+                modifier.show_viewport = True
+        view_layer.objects.active = ori_active
+        return (False, get_topology_error_info(offending, estimate))
+
     # Remember original selected objects
     ori_selected_objs = [o for o in view_layer.objects if o.select_get()]
     
@@ -159,32 +2355,10 @@ def apply_modifiers_with_shape_keys(obj, selectedModifiers, disable_armatures=Tr
     obj.select_set(True)
     
     # Save key shape properties
-    for i in range(0, shapesCount):
-        key_b = obj.data.shape_keys.key_blocks[i]
-        print (obj.data.shape_keys.key_blocks[i].name, key_b.name)
-        properties_object = {p:None for p in properties}
-        properties_object["name"] = key_b.name
-        properties_object["mute"] = key_b.mute
-        properties_object["interpolation"] = key_b.interpolation
-        properties_object["relative_key"] = key_b.relative_key.name
-        properties_object["slider_max"] = key_b.slider_max
-        properties_object["slider_min"] = key_b.slider_min
-        properties_object["value"] = key_b.value
-        properties_object["vertex_group"] = key_b.vertex_group
-        list_properties.append(properties_object)
+    list_properties = get_shape_key_props(obj)
 
     # Save animation data
-    ori_fcurves = []
-    ori_action_name = ''
-    if obj.data.shape_keys.animation_data and obj.data.shape_keys.animation_data.action:
-        ori_action_name = obj.data.shape_keys.animation_data.action.name
-        for fc in get_datablock_fcurves(obj):
-            fc_dic = {}
-
-            for prop in dir(fc):
-                copy_props_to_dict(fc, fc_dic) #, True)
-
-            ori_fcurves.append(fc_dic)
+    ori_action_name, ori_fcurves = save_shape_key_fcurves(obj)
 
     # Handle base shape in original object
     print("apply_modifiers_with_shape_keys: Applying base shape key")
@@ -250,22 +2424,7 @@ def apply_modifiers_with_shape_keys(obj, selectedModifiers, disable_armatures=Tr
     
     # Restore shape key properties like name, mute etc.
     view_layer.objects.active = obj
-    for i in range(0, shapesCount):
-        key_b = view_layer.objects.active.data.shape_keys.key_blocks[i]
-        key_b.name = list_properties[i]["name"]
-        key_b.interpolation = list_properties[i]["interpolation"]
-        key_b.mute = list_properties[i]["mute"]
-        key_b.slider_max = list_properties[i]["slider_max"]
-        key_b.slider_min = list_properties[i]["slider_min"]
-        key_b.value = list_properties[i]["value"]
-        key_b.vertex_group = list_properties[i]["vertex_group"]
-        rel_key = list_properties[i]["relative_key"]
-    
-        for j in range(0, shapesCount):
-            key_brel = view_layer.objects.active.data.shape_keys.key_blocks[j]
-            if rel_key == key_brel.name:
-                key_b.relative_key = key_brel
-                break
+    set_shape_key_props(obj, list_properties)
     
     # Remove copyObject.
     bpy.data.objects.remove(copyObject, do_unlink=True)
@@ -281,34 +2440,7 @@ def apply_modifiers_with_shape_keys(obj, selectedModifiers, disable_armatures=Tr
     obj.active_shape_key_index = originalIndex
 
     # Recover animation data
-    if any(ori_fcurves):
-
-        obj.data.shape_keys.animation_data_create()
-        obj.data.shape_keys.animation_data.action = bpy.data.actions.new(name=ori_action_name)
-
-        for ofc in ori_fcurves:
-            fcurve = new_fcurve(obj, ofc['data_path'])
-
-            for key, val in ofc.items():
-                if key in {'data_path', 'keyframe_points'}: continue
-                try: setattr(fcurve, key, val)
-                except Exception as e: pass
-
-            for kp in ofc['keyframe_points']:
-                k = fcurve.keyframe_points.insert(
-                frame=kp['co'][0],
-                value=kp['co'][1]
-                )
-
-                for key, val in kp.items():
-                    try: setattr(k, key, val)
-                    except Exception as e: pass
-
-            for mod in ofc['modifiers']:
-                m = fcurve.modifiers.new(type=mod['type'])
-                for key, val in mod.items():
-                    try: setattr(m, key, val)
-                    except Exception as e: pass
+    recover_shape_key_fcurves(obj, ori_action_name, ori_fcurves)
 
     obj.hide_set(originalHide)
 
@@ -320,6 +2452,49 @@ def apply_modifiers_with_shape_keys(obj, selectedModifiers, disable_armatures=Tr
     
     return (True, None)
 
+def is_outline_modifier(mod):
+    return mod.type == 'SOLIDIFY' and mod.material_offset > 0 and mod.use_flip_normals
+
+modifier_stack_rules = ['armature_first', 'subsurf_last', 'triangulate_after_subsurf', 'outline_last']
+
+def get_normalized_modifier_order(obj, rules):
+    has_subsurf = any(m.type == 'SUBSURF' for m in obj.modifiers)
+
+    def get_rank(mod):
+        if 'outline_last' in rules and is_outline_modifier(mod): return 3
+        if 'triangulate_after_subsurf' in rules and has_subsurf and mod.type == 'TRIANGULATE': return 2
+        if 'subsurf_last' in rules and mod.type == 'SUBSURF': return 1
+        if 'armature_first' in rules and mod.type == 'ARMATURE': return -1
+        return 0
+
+    # Sorting is stable so the rest of the modifiers keep their order
+    return [m.name for m in sorted(obj.modifiers, key=get_rank)]
+
+def move_modifier(obj, from_index, to_index):
+    if hasattr(obj.modifiers, 'move'):
+        obj.modifiers.move(from_index, to_index)
+        return
+
+    # Older blender can only move modifier using operator
+    name = obj.modifiers[from_index].name
+    if is_bl_newer_than(3, 2):
+        with bpy.context.temp_override(object=obj):
+            bpy.ops.object.modifier_move_to_index(modifier=name, index=to_index)
+    else: bpy.ops.object.modifier_move_to_index({'object' : obj}, modifier=name, index=to_index)
+
+def normalize_modifier_stack(obj, rules):
+    order = get_normalized_modifier_order(obj, rules)
+    names = [m.name for m in obj.modifiers]
+    if names == order: return False
+
+    for i, name in enumerate(order):
+        cur = names.index(name)
+        if cur == i: continue
+        move_modifier(obj, cur, i)
+        names.insert(i, names.pop(cur))
+
+    return True
+
 def is_strokegen_available():
     scene = bpy.context.scene
     return hasattr(scene, 'npr') and hasattr(scene.npr, 'disable_strokegen')
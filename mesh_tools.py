@@ -1,6 +1,16 @@
-import bpy
+import bpy, bmesh, os, time
 from bpy.props import *
+from bpy.app.handlers import persistent
+from bpy_extras.io_utils import ExportHelper, ImportHelper
 from .common import *
+from .mirror_tools import get_mirror_name
+
+def get_boolean_solver_items(self, context):
+    items = [('EXACT', 'Exact', 'Slower solver with the best results, supports collection operand')]
+    if is_bl_newer_than(4, 5):
+        items.append(('MANIFOLD', 'Manifold', 'Fastest solver for manifold meshes, supports collection operand'))
+    items.append(('FAST', 'Fast', 'Simple solver, doesn\'t support collection operand so it always union object one by one'))
+    return items
 
 class YUnionMeshes(bpy.types.Operator):
     bl_idname = "mesh.y_union_meshes"
@@ -33,6 +43,26 @@ class YUnionMeshes(bpy.types.Operator):
             description = "Disable Armature modifier when joining",
             default = True)
 
+    use_collection_operand : BoolProperty(
+            name = "Union All at Once",
+            description = "Put all meshes in a temporary collection and union them with a single boolean modifier (much faster for many objects)",
+            default = True)
+
+    compare_strategies : BoolProperty(
+            name = "Compare Strategies",
+            description = "Also time the other strategy on temporary copies, so timings of both are reported (slower)",
+            default = False)
+
+    solver : EnumProperty(
+            name = "Solver",
+            description = "Boolean solver",
+            items = get_boolean_solver_items)
+
+    use_broad_phase : BoolProperty(
+            name = "Only Boolean Overlapping Parts",
+            description = "Find overlapping parts first, parts that don't touch anything are simply joined",
+            default = True)
+
     @classmethod
     def poll(cls, context):
         return context.object #and context.object.type == 'MESH'
@@ -46,6 +76,10 @@ class YUnionMeshes(bpy.types.Operator):
         self.layout.prop(self, 'disable_subsurf')
         self.layout.prop(self, 'disable_mirror')
         self.layout.prop(self, 'disable_armature')
+        self.layout.prop(self, 'use_collection_operand')
+        self.layout.prop(self, 'compare_strategies')
+        self.layout.prop(self, 'solver')
+        self.layout.prop(self, 'use_broad_phase')
 
     def execute(self, context):
         obj = context.object
@@ -60,32 +94,23 @@ class YUnionMeshes(bpy.types.Operator):
             self.report({'ERROR'}, "Need at least two mesh objects selected!")
             return {'CANCELLED'}
 
-        tool = bpy.context.tool_settings
+        # Modifiers can only be applied in object mode
+        if obj.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
 
         # Check for non manifold meshes
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='DESELECT')
-        if not tool.mesh_select_mode[0]:
-            #tool.mesh_select_mode = (True, False, False)
-            bpy.ops.mesh.select_mode(type="VERT")
-        bpy.ops.mesh.select_non_manifold()
-        bpy.ops.object.mode_set(mode='OBJECT')
+        non_manifolds = []
+        for o in objs:
+            num_edges, num_verts = get_mesh_non_manifold_counts(o.data)
+            if num_edges or num_verts:
+                non_manifolds.append("%s (%d edges, %d vertices)" % (o.name, num_edges, num_verts))
+                print("INFO: '%s' has %d non-manifold edges and %d non-manifold vertices" % (o.name, num_edges, num_verts))
 
-        # Check non manifold
-        if not self.ignore_non_manifold:
-            for o in objs:
-                selected_verts = list(filter(lambda v: v.select, o.data.vertices))
-                if selected_verts:
-                    bpy.ops.object.mode_set(mode='EDIT')
-                    self.report({'ERROR'}, "Found non-manifold objects! Union cancelled!")
-                    return {'FINISHED'}
-
-        # Separate by loose parts
-        if self.union_loose_parts:
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.separate(type='LOOSE')
-            bpy.ops.object.mode_set(mode='OBJECT')
-            objs = [o for o in context.selected_objects if o.type == 'MESH']
+        if non_manifolds and not self.ignore_non_manifold:
+            self.report({'ERROR'}, "Found non-manifold objects! Union cancelled! " + ', '.join(non_manifolds))
+            return {'CANCELLED'}
+
+        startTime = time.time()
 
         for o in objs:
             if o == obj: continue
@@ -99,29 +124,294 @@ class YUnionMeshes(bpy.types.Operator):
                 if self.disable_armature and mod.type == 'ARMATURE':
                     mod.show_viewport = False
 
-            # Add boolean modifier to active object
-            bpy.ops.object.modifier_add(type='BOOLEAN')
-            boolmod = obj.modifiers[-1]
-            boolmod.object = o
+        solver = self.solver
+        if solver == 'FAST' and is_bl_newer_than(4, 5):
+            solver = 'FLOAT'
+        use_collection = self.use_collection_operand and self.solver != 'FAST'
+
+        # Other strategy is timed first on copies, fast solver can only union one by one
+        otherTime = None
+        if self.compare_strategies and self.solver != 'FAST' and len(objs) > 1:
+            otherTime = self.time_union_strategy(context, obj, objs, solver, not use_collection)
+            startTime = time.time()
+
+        if self.use_broad_phase and self.union_loose_parts:
+            failed, num_booleans = self.union_overlapping_islands(context, obj, objs, solver, use_collection)
+
+        elif self.use_broad_phase:
+            failed, num_booleans = self.union_overlapping_objects(context, obj, objs, solver, use_collection)
+
+        else:
+            # Separate by loose parts
+            if self.union_loose_parts:
+                bpy.ops.object.mode_set(mode='EDIT')
+                bpy.ops.mesh.separate(type='LOOSE')
+                bpy.ops.object.mode_set(mode='OBJECT')
+                objs = [o for o in context.selected_objects if o.type == 'MESH']
+
+            failed = self.union_objects(obj, [o for o in objs if o != obj], solver, use_collection)
+            num_booleans = 1 if use_collection else len(objs) - 1
+
+            bpy.ops.object.select_all(action='DESELECT')
+            # Delete objects
+            for o in objs:
+                if o == obj: continue
+                o.select_set(True)
+            bpy.ops.object.delete()
+
+        unionTime = time.time() - startTime
+        strategy = 'all at once' if use_collection else 'one by one'
+        info = "Union of %d meshes (%s, %s solver, %d booleans) is done in %0.2f seconds" % (len(objs), strategy, self.solver.lower(), num_booleans, unionTime)
+        if otherTime != None:
+            other = 'one by one' if use_collection else 'all at once'
+            info += ", union of the same meshes %s took %0.2f seconds" % (other, otherTime)
+        print("INFO: " + info)
+
+        # Back to select active object
+        context.view_layer.objects.active = obj
+        obj.select_set(True)
+
+        if failed:
+            self.report({'WARNING'}, "Union is not applied properly: " + failed[0])
+        else: self.report({'INFO'}, info)
+
+        #print('Aaaaa')
+        return {'FINISHED'}
+
+    def union_objects(self, obj, operands, solver, use_collection):
+        failed = []
+        if not operands: return failed
+
+        if use_collection:
+
+            # Single boolean using all other objects from temporary collection
+            col = bpy.data.collections.new('__union_meshes_temp__')
+            for o in operands:
+                col.objects.link(o)
+
+            boolmod = obj.modifiers.new('Union', 'BOOLEAN')
+            boolmod.operand_type = 'COLLECTION'
+            boolmod.collection = col
             boolmod.operation = 'UNION'
+            boolmod.solver = solver
 
-            # Apply modifier
-            #bpy.ops.object.modifier_apply(apply_as='DATA', modifier=boolmod.name)
-            #bpy.ops.object.modifier_apply(modifier=boolmod.name)
-            apply_modifiers_with_shape_keys(obj, [boolmod.name])
+            success, errorInfo = apply_modifiers_with_shape_keys(obj, [boolmod.name])
+            if not success: failed.append(errorInfo)
 
-        bpy.ops.object.select_all(action='DESELECT')
-        # Delete objects
+            # Remove modifier if it's not applied
+            boolmod = obj.modifiers.get(boolmod.name)
+            if boolmod: obj.modifiers.remove(boolmod)
+
+            bpy.data.collections.remove(col)
+
+        else:
+            for o in operands:
+
+                # Add boolean modifier to active object
+                boolmod = obj.modifiers.new('Union', 'BOOLEAN')
+                boolmod.object = o
+                boolmod.operation = 'UNION'
+                boolmod.solver = solver
+
+                # Apply modifier
+                #bpy.ops.object.modifier_apply(apply_as='DATA', modifier=boolmod.name)
+                #bpy.ops.object.modifier_apply(modifier=boolmod.name)
+                success, errorInfo = apply_modifiers_with_shape_keys(obj, [boolmod.name])
+                if not success: failed.append(errorInfo)
+
+        return failed
+
+    def time_union_strategy(self, context, obj, objs, solver, use_collection):
+        copies = {}
         for o in objs:
-            if o == obj: continue
+            c = o.copy()
+            c.data = o.data.copy()
+            context.scene.collection.objects.link(c)
+            copies[o] = c
+
+        startTime = time.time()
+        self.union_objects(copies[obj], [copies[o] for o in objs if o != obj], solver, use_collection)
+        unionTime = time.time() - startTime
+
+        for c in copies.values():
+            mesh = c.data
+            bpy.data.objects.remove(c, do_unlink=True)
+            if mesh.users == 0: bpy.data.meshes.remove(mesh)
+
+        return unionTime
+
+    def union_overlapping_objects(self, context, obj, objs, solver, use_collection):
+
+        # Active object will only use its own mesh since other modifiers are not applied
+        depsgraph = context.evaluated_depsgraph_get()
+        units = [get_mesh_world_triangles(o, None if o == obj else depsgraph) for o in objs]
+        clusters = get_overlapping_clusters(units)
+        print("INFO: Broad phase found %d overlapping groups from %d meshes" % (len([c for c in clusters if len(c) > 1]), len(objs)))
+
+        # Boolean only inside overlapping groups
+        failed = []
+        num_booleans = 0
+        consumed = []
+        others = []
+        for cluster in clusters:
+            cobjs = [objs[i] for i in cluster]
+            target = obj if obj in cobjs else cobjs[0]
+            operands = [o for o in cobjs if o != target]
+            if operands:
+                failed.extend(self.union_objects(target, operands, solver, use_collection))
+                num_booleans += 1 if use_collection else len(operands)
+            consumed.extend(operands)
+            if target != obj: others.append(target)
+
+        bpy.ops.object.select_all(action='DESELECT')
+        for o in consumed:
             o.select_set(True)
         bpy.ops.object.delete()
 
-        # Back to select active object
+        # The rest can simply be joined
+        failed.extend(join_objects_with_modifiers(obj, others))
+
+        return failed, num_booleans
+
+    def union_overlapping_islands(self, context, obj, objs, solver, use_collection):
+        failed = join_objects_with_modifiers(obj, [o for o in objs if o != obj])
+
+        islands, units = get_mesh_island_units(obj)
+        clusters = [c for c in get_overlapping_clusters(units) if len(c) > 1]
+        print("INFO: Broad phase found %d overlapping groups from %d loose parts" % (len(clusters), len(units)))
+        if not clusters: return failed, 0
+
+        # Separate overlapping parts only
+        mesh = obj.data
+        overlapping = np.zeros(len(units), dtype=bool)
+        for c in clusters: overlapping[c] = True
+        vert_sel = overlapping[islands]
+        edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get('vertices', edges)
+        loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+
+        mesh.vertices.foreach_set('select', vert_sel)
+        mesh.edges.foreach_set('select', vert_sel[edges[0::2]])
+        mesh.polygons.foreach_set('select', vert_sel[loop_verts[loop_starts]])
+
+        bpy.ops.object.select_all(action='DESELECT')
         obj.select_set(True)
+        bpy.ops.object.mode_set(mode='EDIT')
+        bpy.ops.mesh.separate(type='SELECTED')
+        bpy.ops.object.mode_set(mode='OBJECT')
+        temp = [o for o in context.selected_objects if o != obj][0]
+
+        # Exact solver can self union all overlapping parts with a single boolean
+        if solver == 'EXACT':
+            col = bpy.data.collections.new('__union_meshes_temp__')
+            boolmod = temp.modifiers.new('Union', 'BOOLEAN')
+            boolmod.operand_type = 'COLLECTION'
+            boolmod.collection = col
+            boolmod.operation = 'UNION'
+            boolmod.solver = solver
+            boolmod.use_self = True
 
-        #print('Aaaaa')
-        return {'FINISHED'}
+            # Only apply the boolean, modifiers from the original object stay on the joined object
+            success, errorInfo = apply_modifiers_with_shape_keys(temp, [boolmod.name])
+            if not success: failed.append(errorInfo)
+            bpy.data.collections.remove(col)
+
+            temp.modifiers.clear()
+            failed.extend(join_objects_with_modifiers(obj, [temp]))
+
+            return failed, 1
+
+        # Other solvers don't support self union, so overlapping parts are unioned as objects
+        temp.modifiers.clear()
+        bpy.ops.object.select_all(action='DESELECT')
+        temp.select_set(True)
+        context.view_layer.objects.active = temp
+        bpy.ops.object.mode_set(mode='EDIT')
+        bpy.ops.mesh.separate(type='LOOSE')
+        bpy.ops.object.mode_set(mode='OBJECT')
+        parts = [o for o in context.selected_objects if o.type == 'MESH']
+
+        part_failed, num_booleans = self.union_overlapping_objects(context, temp, parts, solver, use_collection)
+        failed.extend(part_failed)
+        failed.extend(join_objects_with_modifiers(obj, [temp]))
+
+        return failed, num_booleans
+
+def join_objects_with_modifiers(obj, objs):
+    failed = []
+    if not objs: return failed
+
+    # Modifiers of joined objects would be lost, apply the enabled ones first
+    for o in objs:
+        mod_names = [m.name for m in o.modifiers if m.show_viewport]
+        if mod_names:
+            success, errorInfo = apply_modifiers_with_shape_keys(o, mod_names)
+            if not success: failed.append(errorInfo)
+
+    bpy.ops.object.select_all(action='DESELECT')
+    for o in objs:
+        o.select_set(True)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.object.join()
+
+    return failed
+
+def get_shape_key_reset_indices(obj):
+    key_blocks = obj.data.shape_keys.key_blocks
+
+    # Reset from basis will reset all other shape keys
+    if obj.active_shape_key.name == 'Basis':
+        return [i for i in range(len(key_blocks)) if i != obj.active_shape_key_index]
+
+    return [obj.active_shape_key_index]
+
+def reset_shape_keys_in_edit_mode(obj, indices):
+    mesh = obj.data
+    key_blocks = mesh.shape_keys.key_blocks
+    bm = bmesh.from_edit_mesh(mesh)
+    layers = bm.verts.layers.shape
+
+    # Basis edits are added to other shape keys when leaving edit mode,
+    # so resetting to basis layer will make them follow the edited basis
+    basis_layer = layers.get(key_blocks[0].name)
+    target_layers = [layers.get(key_blocks[i].name) for i in indices]
+    reset_active = obj.active_shape_key_index in indices
+
+    for v in bm.verts:
+        if not v.select: continue
+        co = v[basis_layer]
+        for layer in target_layers:
+            v[layer] = co
+        if reset_active:
+            v.co = co
+
+    bmesh.update_edit_mesh(mesh)
+
+def reset_shape_keys_in_object_mode(obj, indices):
+    mesh = obj.data
+    key_blocks = mesh.shape_keys.key_blocks
+
+    # Shape keys are only written when leaving edit mode
+    invalidate_shape_key_sparse_index(mesh)
+    index = get_shape_key_sparse_index(obj)
+
+    select = np.zeros(len(mesh.vertices), dtype=bool)
+    mesh.vertices.foreach_get('select', select)
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    co = co.reshape(-1, 3)
+
+    # Only selected vertices moved by the key need to be reset
+    for i in indices:
+        ids = index.get(i)[0]
+        ids = ids[select[ids]]
+        set_shape_key_coords_sparse(key_blocks[i], ids, co[ids])
+
+    invalidate_shape_key_sparse_index(mesh)
 
 class YShapeKeyReset(bpy.types.Operator):
     bl_idname = "mesh.y_shape_key_reset"
@@ -136,25 +426,25 @@ class YShapeKeyReset(bpy.types.Operator):
 
     def execute(self, context):
 
-        obj = context.object
-        mesh = obj.data
-        keys = [obj.active_shape_key]
+        objs = [o for o in context.objects_in_mode_unique_data if o.type == 'MESH' and o.data.shape_keys and o.active_shape_key]
+        indices = [get_shape_key_reset_indices(o) for o in objs]
 
-        if obj.active_shape_key.name == 'Basis':
-            sks = [sk for sk in bpy.data.shape_keys if sk.user == mesh]
-            if sks:
-                keys = [key for key in sks[0].key_blocks if key != obj.active_shape_key]
+        # Writing bmesh layers is done per vertex, so only use it for small selections,
+        # otherwise leaving edit mode once for all objects is faster
+        num_writes = sum(o.data.total_vert_sel * len(indices[i]) for i, o in enumerate(objs))
+        if num_writes <= 200000:
+            for i, o in enumerate(objs):
+                reset_shape_keys_in_edit_mode(o, indices[i])
+            return {'FINISHED'}
 
         bpy.ops.object.mode_set(mode='OBJECT')
 
-        for key in keys:
-            for i, v in enumerate(mesh.vertices):
-                if v.select:
-                    #print(i, key.data[i].co, v.co)
-                    key.data[i].co.x = v.co.x
-                    key.data[i].co.y = v.co.y
-                    key.data[i].co.z = v.co.z
+        for i, o in enumerate(objs):
+            reset_shape_keys_in_object_mode(o, indices[i])
 
+        # Make sure all objects go back to edit mode
+        for o in objs:
+            if not o.select_get(): o.select_set(True)
         bpy.ops.object.mode_set(mode='EDIT')
 
         return {'FINISHED'}
@@ -196,7 +486,7 @@ class YApplyShapeKey(bpy.types.Operator):
 
         obj = context.object
         mesh = obj.data
-        sks = [sk for sk in bpy.data.shape_keys if sk.user == mesh]
+        key_blocks = mesh.shape_keys.key_blocks
         key = obj.active_shape_key
         basis = key.relative_key
 
@@ -207,86 +497,660 @@ class YApplyShapeKey(bpy.types.Operator):
         # Get value
         value = key.value if self.use_current_value else 1.0
 
-        # All keys expect basis
-        keys = [sk for sk in sks[0].key_blocks if sk != basis]
-
-        # Check other keys relative position
-        rels = []
-        rel_key_idx = -1
-        for i, k in enumerate(keys):
-            if k == key: rel_key_idx = i
-            cos = []
-            for i, v in enumerate(k.data):
-                cos.append(v.co - basis.data[i].co)
-            rels.append(cos)
-
-        rel_key = rels[rel_key_idx]
-
-        # Apply key to basis
-        for i, v in enumerate(basis.data):
-            v.co.x += rel_key[i].x * value
-            v.co.y += rel_key[i].y * value
-            v.co.z += rel_key[i].z * value
-
-        # Recover relative other keys coordinates
-        for i, k in enumerate(keys):
-            if k == key: continue
-            for j, v in enumerate(k.data):
-                v.co.x = basis.data[j].co.x + rels[i][j].x
-                v.co.y = basis.data[j].co.y + rels[i][j].y
-                v.co.z = basis.data[j].co.z + rels[i][j].z
+        # All shape keys coordinates in one array
+        keys_co = get_shape_keys_coords(obj)
+        key_idx = obj.active_shape_key_index
+        offset = (keys_co[key_idx] - keys_co[key_blocks.find(basis.name)]) * value
+
+        # Apply key to basis and move other keys along to keep their relative position
+        for i, kb in enumerate(key_blocks):
+            if i == key_idx: continue
+            keys_co[i] += offset
+            kb.data.foreach_set('co', keys_co[i].ravel())
+
+        mesh.update()
+
+        invalidate_shape_key_sparse_index(mesh)
 
         # Remove current shape key
         if self.delete_original:
             bpy.ops.object.shape_key_remove()
 
         # Point to basis
-        for i, sk in enumerate(sks[0].key_blocks):
+        for i, sk in enumerate(key_blocks):
             if sk.name == 'Basis':
                 obj.active_shape_key_index = i
 
         return {'FINISHED'}
 
+class YPropertyCollectionCheckItem(bpy.types.PropertyGroup):
+    checked: BoolProperty(name="", default=False)
+
 class YShapeKeyToAttribute(bpy.types.Operator):
     bl_idname = "mesh.y_shape_key_to_attribute"
     bl_label = "Convert Shape Key to Attribute"
-    bl_description = "Convert shape key to attribute"
+    bl_description = "Convert shape keys to attributes"
     bl_options = {'REGISTER', 'UNDO'}
 
+    my_collection: CollectionProperty(type=YPropertyCollectionCheckItem)
+
     @classmethod
     def poll(cls, context):
         obj = context.object
         return obj and obj.type == 'MESH' and obj.data.shape_keys
 
+    def invoke(self, context, event):
+        obj = context.object
+        self.my_collection.clear()
+        for i, kb in enumerate(obj.data.shape_keys.key_blocks):
+            if kb == kb.relative_key: continue
+            item = self.my_collection.add()
+            item.name = kb.name
+            item.checked = i == obj.active_shape_key_index
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        box = self.layout.box()
+        for prop in self.my_collection:
+            box.prop(prop, "checked", text=prop["name"])
+
     def execute(self, context):
         obj = context.object
         mesh = obj.data
-        sks = [sk for sk in bpy.data.shape_keys if sk.user == mesh]
-        key = obj.active_shape_key
+        key_blocks = mesh.shape_keys.key_blocks
+
+        # Use active shape key if not invoked from dialog
+        if self.my_collection:
+            indices = [key_blocks.find(o.name) for o in self.my_collection if o.checked and o.name in key_blocks]
+        else:
+            key = obj.active_shape_key
+            if key == key.relative_key:
+                self.report({'ERROR'}, "Active shape key must not be Basis")
+                return {'CANCELLED'}
+            indices = [obj.active_shape_key_index]
+
+        if not indices:
+            self.report({'ERROR'}, 'No shape key selected!')
+            return {'CANCELLED'}
 
-        if key == key.relative_key:
-            self.report({'ERROR'}, "Active shape key must not be Basis")
+        ori_mode = obj.mode
+        if obj.mode == 'EDIT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+            # Shape keys are only written when leaving edit mode
+            invalidate_shape_key_sparse_index(mesh)
+
+        attr_names = shape_keys_to_attributes(obj, indices)
+
+        if ori_mode != obj.mode:
+            bpy.ops.object.mode_set(mode=ori_mode)
+
+        if len(attr_names) == 1:
+            self.report({'INFO'}, "Shape key '" + key_blocks[indices[0]].name + "' is converted to attribute '" + attr_names[0] + "'!")
+        else: self.report({'INFO'}, str(len(attr_names)) + " shape keys are converted to attributes!")
+
+        return {'FINISHED'}
+
+class YAttributeToShapeKey(bpy.types.Operator):
+    bl_idname = "mesh.y_attribute_to_shape_key"
+    bl_label = "Convert Attribute to Shape Key"
+    bl_description = "Convert point vector attributes to shape keys (attribute is offset from basis)"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    my_collection: CollectionProperty(type=YPropertyCollectionCheckItem)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH'
+
+    def invoke(self, context, event):
+        obj = context.object
+        self.my_collection.clear()
+        for attr in obj.data.attributes:
+            if not is_shape_key_attribute(attr) or attr.name.startswith('.'): continue
+            item = self.my_collection.add()
+            item.name = attr.name
+            item.checked = attr.name.startswith(shape_key_attribute_prefix)
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        if not self.my_collection:
+            self.layout.label(text='No point vector attribute found!', icon='ERROR')
+        box = self.layout.box()
+        for prop in self.my_collection:
+            box.prop(prop, "checked", text=prop["name"])
+
+    def execute(self, context):
+        obj = context.object
+        mesh = obj.data
+
+        # Use all shape key attributes if not invoked from dialog
+        if self.my_collection:
+            attr_names = [o.name for o in self.my_collection if o.checked]
+        else: attr_names = [a.name for a in mesh.attributes if is_shape_key_attribute(a) and a.name.startswith(shape_key_attribute_prefix)]
+
+        if not attr_names:
+            self.report({'ERROR'}, 'No attribute selected!')
             return {'CANCELLED'}
 
         ori_mode = obj.mode
         if obj.mode == 'EDIT':
             bpy.ops.object.mode_set(mode='OBJECT')
 
-        # Set or Get Attribute
-        attr_name = 'SK-' + key.name
-        attr = obj.data.attributes.get(attr_name)
-        if not attr:
-            attr = obj.data.attributes.new(attr_name, 'FLOAT_VECTOR', 'POINT')
+        key_names = attributes_to_shape_keys(obj, attr_names)
+
+        if ori_mode != obj.mode:
+            bpy.ops.object.mode_set(mode=ori_mode)
+
+        self.report({'INFO'}, str(len(key_names)) + " attributes are converted to shape keys!")
+
+        return {'FINISHED'}
+
+class YMirrorShapeKeys(bpy.types.Operator):
+    bl_idname = "mesh.y_mirror_shape_keys"
+    bl_label = "Mirror Shape Keys"
+    bl_description = "Mirror, symmetrize, or flip shape keys using vertex symmetry pairs"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    my_collection: CollectionProperty(type=YPropertyCollectionCheckItem)
+
+    mode : EnumProperty(
+            name = 'Mode',
+            items = (('MIRROR', 'Mirror to New Key', 'Write the flipped shape key to a key with mirrored name (e.g. Smile.L to Smile.R)'),
+                     ('SYMMETRIZE', 'Symmetrize', 'Copy one side of shape key to the other side'),
+                     ('FLIP', 'Flip', 'Flip shape key to the other side')),
+            default = 'MIRROR')
+
+    axis : EnumProperty(
+            name = 'Axis',
+            items = (('0', 'X', ''),
+                     ('1', 'Y', ''),
+                     ('2', 'Z', '')),
+            default = '0')
+
+    direction : EnumProperty(
+            name = 'Direction',
+            description = 'Symmetrize direction',
+            items = (('POSITIVE', '+ to -', ''),
+                     ('NEGATIVE', '- to +', '')),
+            default = 'POSITIVE')
+
+    tolerance : FloatProperty(
+            name = 'Tolerance',
+            description = 'Maximum distance between a vertex and the mirrored position of its pair',
+            default = 0.001, min = 0.0, precision = 4)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.data.shape_keys
+
+    def invoke(self, context, event):
+        obj = context.object
+        self.my_collection.clear()
+        for i, kb in enumerate(obj.data.shape_keys.key_blocks):
+            if kb == kb.relative_key: continue
+            item = self.my_collection.add()
+            item.name = kb.name
+            item.checked = i == obj.active_shape_key_index
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        self.layout.prop(self, 'mode')
+        r = self.layout.row()
+        r.prop(self, 'axis', expand=True)
+        if self.mode == 'SYMMETRIZE':
+            self.layout.prop(self, 'direction')
+        self.layout.prop(self, 'tolerance')
+        box = self.layout.box()
+        for prop in self.my_collection:
+            box.prop(prop, "checked", text=prop["name"])
+
+    def execute(self, context):
+        obj = context.object
+        mesh = obj.data
+        key_blocks = mesh.shape_keys.key_blocks
+
+        # Use active shape key if not invoked from dialog
+        if self.my_collection:
+            keys = [key_blocks[o.name] for o in self.my_collection if o.checked and o.name in key_blocks]
+        else:
+            key = obj.active_shape_key
+            if key == key.relative_key:
+                self.report({'ERROR'}, "Active shape key must not be Basis")
+                return {'CANCELLED'}
+            keys = [key]
+
+        if not keys:
+            self.report({'ERROR'}, 'No shape key selected!')
+            return {'CANCELLED'}
+
+        ori_mode = obj.mode
+        if obj.mode == 'EDIT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+            # Shape keys are only written when leaving edit mode
+            invalidate_mesh_caches(mesh)
+
+        axis = int(self.axis)
+        pairs = get_mesh_symmetry_pairs(mesh, axis, self.tolerance)
+        direction = 1 if self.direction == 'POSITIVE' else -1
+
+        num_verts = len(mesh.vertices)
+        coords = {}
+        def get_coords(kb):
+            if kb.name not in coords:
+                co = np.empty(num_verts * 3, dtype=np.float32)
+                kb.data.foreach_get('co', co)
+                coords[kb.name] = co.reshape(-1, 3)
+            return coords[kb.name]
+
+        ref_co = get_coords(mesh.shape_keys.reference_key)
+
+        # Read all sources first so keys mirrored to each other won't use already written data
+        results = []
+        for kb in keys:
+            co = get_mirrored_shape_key_coords(get_coords(kb), get_coords(kb.relative_key), ref_co, pairs, axis, self.mode, direction)
+            results.append((kb, co))
+
+        for kb, co in results:
+            target = kb
+            if self.mode == 'MIRROR':
+                name = get_mirror_name(kb.name)
+                if name == '': name = kb.name + '_mirror'
+                target = key_blocks.get(name)
+                if not target:
+                    target = obj.shape_key_add(name=name, from_mix=False)
+                    target.relative_key = kb.relative_key
+                    target.slider_min = kb.slider_min
+                    target.slider_max = kb.slider_max
+                    vg_name = get_mirror_name(kb.vertex_group)
+                    target.vertex_group = vg_name if vg_name in obj.vertex_groups else kb.vertex_group
+
+            target.data.foreach_set('co', co.ravel())
+
+        invalidate_shape_key_sparse_index(mesh)
+        mesh.update()
+
+        if ori_mode != obj.mode:
+            bpy.ops.object.mode_set(mode=ori_mode)
+
+        num_unpaired = int(np.count_nonzero(pairs < 0))
+        if num_unpaired > 0:
+            result = 'are left unchanged' if self.mode == 'SYMMETRIZE' else 'are reset to their relative key'
+            self.report({'WARNING'}, str(len(results)) + " shape keys are processed, " + str(num_unpaired) + " vertices have no mirror pair and " + result + "!")
+        else: self.report({'INFO'}, str(len(results)) + " shape keys are processed!")
+
+        return {'FINISHED'}
+
+class YSplitShapeKeys(bpy.types.Operator):
+    bl_idname = "mesh.y_split_shape_keys"
+    bl_label = "Split Shape Keys"
+    bl_description = "Split shape keys into left and right sides or into vertex group regions"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    my_collection: CollectionProperty(type=YPropertyCollectionCheckItem)
+    group_collection: CollectionProperty(type=YPropertyCollectionCheckItem)
+
+    mode : EnumProperty(
+            name = 'Split By',
+            items = (('SIDE', 'Side', 'Split into left (+) and right (-) side'),
+                     ('VERTEX_GROUPS', 'Vertex Groups', 'Split into regions based on vertex groups')),
+            default = 'SIDE')
+
+    axis : EnumProperty(
+            name = 'Axis',
+            items = (('0', 'X', ''),
+                     ('1', 'Y', ''),
+                     ('2', 'Z', '')),
+            default = '0')
+
+    falloff_width : FloatProperty(
+            name = 'Falloff Width',
+            description = 'Width of smooth blending across the mirror plane',
+            default = 0.0, min = 0.0, subtype = 'DISTANCE')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.data.shape_keys
+
+    def invoke(self, context, event):
+        obj = context.object
+        self.my_collection.clear()
+        for i, kb in enumerate(obj.data.shape_keys.key_blocks):
+            if kb == kb.relative_key: continue
+            item = self.my_collection.add()
+            item.name = kb.name
+            item.checked = i == obj.active_shape_key_index
+
+        self.group_collection.clear()
+        for vg in obj.vertex_groups:
+            item = self.group_collection.add()
+            item.name = vg.name
+
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        self.layout.prop(self, 'mode')
+        if self.mode == 'SIDE':
+            r = self.layout.row()
+            r.prop(self, 'axis', expand=True)
+            self.layout.prop(self, 'falloff_width')
+        else:
+            self.layout.label(text='Vertex Groups:')
+            box = self.layout.box()
+            for prop in self.group_collection:
+                box.prop(prop, "checked", text=prop["name"])
+
+        self.layout.label(text='Shape Keys:')
+        box = self.layout.box()
+        for prop in self.my_collection:
+            box.prop(prop, "checked", text=prop["name"])
 
-        for i, v in enumerate(mesh.vertices):
-            attr.data[i].vector.x = key.data[i].co.x - v.co.x
-            attr.data[i].vector.y = key.data[i].co.y - v.co.y
-            attr.data[i].vector.z = key.data[i].co.z - v.co.z
+    def execute(self, context):
+        obj = context.object
+        mesh = obj.data
+        key_blocks = mesh.shape_keys.key_blocks
+
+        # Use active shape key if not invoked from dialog
+        if self.my_collection:
+            keys = [key_blocks[o.name] for o in self.my_collection if o.checked and o.name in key_blocks]
+        else:
+            key = obj.active_shape_key
+            if key == key.relative_key:
+                self.report({'ERROR'}, "Active shape key must not be Basis")
+                return {'CANCELLED'}
+            keys = [key]
+
+        if not keys:
+            self.report({'ERROR'}, 'No shape key selected!')
+            return {'CANCELLED'}
+
+        ori_mode = obj.mode
+        if obj.mode == 'EDIT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+            # Shape keys are only written when leaving edit mode
+            invalidate_shape_key_sparse_index(mesh)
+
+        num_verts = len(mesh.vertices)
+        coords = {}
+        def get_coords(kb):
+            if kb.name not in coords:
+                co = np.empty(num_verts * 3, dtype=np.float32)
+                kb.data.foreach_get('co', co)
+                coords[kb.name] = co.reshape(-1, 3)
+            return coords[kb.name]
+
+        if self.mode == 'SIDE':
+            weights = get_side_split_weights(get_coords(mesh.shape_keys.reference_key), int(self.axis), self.falloff_width)
+            suffixes = ['.L', '.R']
+        else:
+            groups = [obj.vertex_groups[o.name] for o in self.group_collection if o.checked and o.name in obj.vertex_groups]
+            if not groups:
+                if ori_mode != obj.mode:
+                    bpy.ops.object.mode_set(mode=ori_mode)
+                self.report({'ERROR'}, 'No vertex group selected!')
+                return {'CANCELLED'}
+            weights = get_vertex_group_split_weights(obj, [vg.index for vg in groups])
+            suffixes = ['_' + vg.name for vg in groups]
+
+        # Read all sources first since split keys can replace the selected keys
+        results = []
+        for kb in keys:
+            rel_co = get_coords(kb.relative_key)
+            splits, remainder = split_shape_key_deltas(get_coords(kb) - rel_co, weights)
+
+            # Vertices outside of all groups get their own key, otherwise the remainder is only rounding error
+            names = [kb.name + s for s in suffixes]
+            if np.abs(remainder).max(initial=0.0) > 1e-6:
+                splits = np.concatenate((splits, remainder[None]))
+                names.append(kb.name + '_rest')
+            else: splits[-1] += remainder
+
+            results.append((kb, rel_co, names, splits))
+
+        num_keys = 0
+        for kb, rel_co, names, splits in results:
+            for name, delta in zip(names, splits):
+                target = key_blocks.get(name)
+                if not target:
+                    target = obj.shape_key_add(name=name, from_mix=False)
+                    target.relative_key = kb.relative_key
+                    target.slider_min = kb.slider_min
+                    target.slider_max = kb.slider_max
+                    target.vertex_group = kb.vertex_group
+                target.data.foreach_set('co', (rel_co + delta).ravel())
+                num_keys += 1
+
+        invalidate_shape_key_sparse_index(mesh)
+        mesh.update()
 
         if ori_mode != obj.mode:
             bpy.ops.object.mode_set(mode=ori_mode)
 
-        self.report({'INFO'}, "Shape key '" + key.name + "' is converted to attribute '" + attr_name + "'!")
+        self.report({'INFO'}, str(len(results)) + " shape keys are split into " + str(num_keys) + " shape keys!")
+
+        return {'FINISHED'}
+
+class YCorrectiveShapeKey(bpy.types.Operator):
+    bl_idname = "mesh.y_corrective_shape_key"
+    bl_label = "Corrective Shape Key from Sculpt"
+    bl_description = "Create corrective shape key on active object from selected sculpted mesh of the current pose"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    name : StringProperty(
+            name = 'Shape Key Name',
+            default = 'Corrective')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.mode == 'OBJECT' and len(context.selected_objects) > 1
+
+    def execute(self, context):
+        obj = context.object
+        mesh = obj.data
+
+        targets = [o for o in context.selected_objects if o != obj and o.type == 'MESH']
+        if not targets:
+            self.report({'ERROR'}, 'Need another selected mesh as sculpted target!')
+            return {'CANCELLED'}
+        target = targets[0]
+
+        deltas, errorInfo = get_corrective_shape_key_deltas(obj, target)
+        if errorInfo:
+            self.report({'ERROR'}, errorInfo)
+            return {'CANCELLED'}
+
+        if not mesh.shape_keys:
+            obj.shape_key_add(name='Basis', from_mix=False)
+
+        kb = obj.shape_key_add(name=self.name, from_mix=False)
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        kb.data.foreach_get('co', co)
+        kb.data.foreach_set('co', (co.reshape(-1, 3) + deltas).ravel())
+        kb.value = 1.0
+
+        obj.active_shape_key_index = len(mesh.shape_keys.key_blocks) - 1
+        invalidate_shape_key_sparse_index(mesh)
+        mesh.update()
+
+        self.report({'INFO'}, "Corrective shape key '" + kb.name + "' is created from '" + target.name + "'!")
+
+        return {'FINISHED'}
+
+class YTransferShapeKeys(bpy.types.Operator):
+    bl_idname = "mesh.y_transfer_shape_keys"
+    bl_label = "Transfer Shape Keys"
+    bl_description = "Transfer shape keys from selected mesh to active mesh with different topology"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    my_collection: CollectionProperty(type=YPropertyCollectionCheckItem)
+
+    max_distance : FloatProperty(
+            name = 'Max Distance',
+            description = 'Vertices further than this from the source surface are not affected, 0 means unlimited',
+            default = 0.0, min = 0.0, subtype = 'DISTANCE')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.mode == 'OBJECT' and len(context.selected_objects) > 1
+
+    def get_source(self, context):
+        obj = context.object
+        sources = [o for o in context.selected_objects if o != obj and o.type == 'MESH' and o.data.shape_keys]
+        return sources[0] if sources else None
+
+    def invoke(self, context, event):
+        source = self.get_source(context)
+        self.my_collection.clear()
+        if source:
+            for kb in source.data.shape_keys.key_blocks[1:]:
+                item = self.my_collection.add()
+                item.name = kb.name
+                item.checked = True
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        self.layout.prop(self, 'max_distance')
+        box = self.layout.box()
+        for prop in self.my_collection:
+            box.prop(prop, "checked", text=prop["name"])
+
+    def execute(self, context):
+        obj = context.object
+        source = self.get_source(context)
+        if not source:
+            self.report({'ERROR'}, 'Need another selected mesh with shape keys as source!')
+            return {'CANCELLED'}
+
+        # Transfer all shape keys if not invoked from dialog
+        if self.my_collection:
+            names = [o.name for o in self.my_collection if o.checked]
+        else: names = [kb.name for kb in source.data.shape_keys.key_blocks[1:]]
+
+        if not names:
+            self.report({'ERROR'}, 'No shape key selected!')
+            return {'CANCELLED'}
+
+        T = time.time()
+        names = transfer_shape_keys(obj, source, names, self.max_distance)
+
+        self.report({'INFO'}, str(len(names)) + " shape keys are transferred from '" + source.name + "' in " + '{:0.2f}'.format(time.time() - T) + ' seconds!')
+
+        return {'FINISHED'}
+
+class YExportShapeKeyArchive(bpy.types.Operator, ExportHelper):
+    bl_idname = "mesh.y_export_shape_key_archive"
+    bl_label = "Export Shape Key Archive"
+    bl_description = "Export all shape keys as packed deltas which can be partially imported later"
+
+    filename_ext = '.npz'
+    filter_glob : StringProperty(default='*.npz', options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.data.shape_keys and obj.mode == 'OBJECT'
+
+    def execute(self, context):
+        obj = context.object
+
+        try: write_shape_key_archive(obj, self.filepath)
+        except Exception as e:
+            self.report({'ERROR'}, "Cannot write shape key archive: " + str(e))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, str(len(obj.data.shape_keys.key_blocks)) + " shape keys are exported to '" + self.filepath + "'")
+
+        return {'FINISHED'}
+
+class YExportQuantizedMorphs(bpy.types.Operator, ExportHelper):
+    bl_idname = "mesh.y_export_quantized_morphs"
+    bl_label = "Export Quantized Morphs"
+    bl_description = "Export shape keys as sparse int16 morph targets for real-time engines, with an error report"
+
+    filename_ext = '.npz'
+    filter_glob : StringProperty(default='*.npz', options={'HIDDEN'})
+
+    tolerance : FloatProperty(
+            name = 'Tolerance',
+            description = 'Vertices moving less than this are dropped',
+            default = 0.0001, min = 0.0, precision = 5)
+
+    write_report : BoolProperty(
+            name = 'Write Error Report',
+            description = 'Write JSON error report next to the exported file',
+            default = True)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.data.shape_keys and obj.mode == 'OBJECT'
+
+    def execute(self, context):
+        obj = context.object
+
+        report_filepath = ''
+        if self.write_report:
+            report_filepath = os.path.splitext(self.filepath)[0] + '_report.json'
+
+        try: report = write_quantized_morphs(obj, self.filepath, self.tolerance, report_filepath)
+        except Exception as e:
+            self.report({'ERROR'}, "Cannot write quantized morphs: " + str(e))
+            return {'CANCELLED'}
+
+        ratio = report['quantized_bytes'] / max(report['dense_bytes'], 1) * 100
+        self.report({'INFO'}, str(len(report['keys'])) + " morphs are exported (" + '{:0.1f}'.format(ratio) + "% of float32 size), max error is " + '{:0.6f}'.format(report['max_error']))
+
+        return {'FINISHED'}
+
+class YImportShapeKeyArchive(bpy.types.Operator, ImportHelper):
+    bl_idname = "mesh.y_import_shape_key_archive"
+    bl_label = "Import Shape Key Archive"
+    bl_description = "Import shape keys from shape key archive (existing shape keys with the same name will be replaced)"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = '.npz'
+    filter_glob : StringProperty(default='*.npz', options={'HIDDEN'})
+
+    key_filter : StringProperty(
+            name = 'Shape Key Filter',
+            description = 'Only import shape keys with matching names (wildcards can be used, separate patterns with comma)',
+            default = '*')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.mode == 'OBJECT'
+
+    def execute(self, context):
+        from fnmatch import fnmatchcase
+        obj = context.object
+
+        try: archive = ShapeKeyArchive(self.filepath)
+        except Exception as e:
+            self.report({'ERROR'}, "Cannot read shape key archive: " + str(e))
+            return {'CANCELLED'}
+
+        patterns = [p.strip() for p in self.key_filter.split(',') if p.strip()]
+        names = [k['name'] for k in archive.keys[1:] if any(fnmatchcase(k['name'], p) for p in patterns)]
+
+        if not names:
+            self.report({'ERROR'}, "No shape key in the archive matches '" + self.key_filter + "'")
+            return {'CANCELLED'}
+
+        key_names, errorInfo = import_shape_key_archive(obj, archive, names)
+
+        if errorInfo:
+            self.report({'ERROR'}, errorInfo)
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, str(len(key_names)) + " shape keys are imported!")
 
         return {'FINISHED'}
 
@@ -302,19 +1166,86 @@ class YMakeSubsurfLast(bpy.types.Operator):
         return obj and obj.type == 'MESH'
 
     def execute(self, context):
-        objs = context.selected_objects
-        ori_active_obj = context.object
         for obj in context.selected_objects:
             if hasattr(obj, 'modifiers') and any([m for m in obj.modifiers if m.type == 'SUBSURF']):
             #if obj.type == 'MESH' and any([m for m in obj.modifiers if m.type == 'SUBSURF']):
-                context.view_layer.objects.active = obj
-                mod_name = [m for m in obj.modifiers if m.type == 'SUBSURF'][0].name
-                bpy.ops.object.modifier_move_to_index(modifier=mod_name, index=len(obj.modifiers)-1)
+                normalize_modifier_stack(obj, ['subsurf_last'])
 
                 if obj.type == 'MESH' and not is_bl_newer_than(4, 1):
                     obj.data.use_auto_smooth = False
 
-        context.view_layer.objects.active = ori_active_obj
+        return {'FINISHED'}
+
+class YNormalizeModifierStacks(bpy.types.Operator):
+    bl_idname = "object.y_normalize_modifier_stacks"
+    bl_label = "Normalize Modifier Stacks"
+    bl_description = "Reorder modifier stacks of many objects using rules"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    scope : EnumProperty(
+            name = 'Scope',
+            description = 'Objects to normalize',
+            items = (('SELECTED', 'Selected Objects', ''),
+                     ('COLLECTION', 'Active Collection', 'Objects in active collection and its children'),
+                     ('SCENE', 'Whole Scene', '')),
+            default = 'SELECTED')
+
+    armature_first : BoolProperty(
+            name = 'Armature First',
+            description = 'Move armature modifiers to the top of the stack',
+            default = False)
+
+    subsurf_last : BoolProperty(
+            name = 'Subsurf Last',
+            description = 'Move subdivision surface modifiers to the bottom of the stack',
+            default = True)
+
+    triangulate_after_subsurf : BoolProperty(
+            name = 'Triangulate after Subsurf',
+            description = 'Move triangulate modifiers below subdivision surface',
+            default = True)
+
+    outline_last : BoolProperty(
+            name = 'Outline Last',
+            description = 'Move outline solidify modifiers after everything',
+            default = True)
+
+    @classmethod
+    def poll(cls, context):
+        return True
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        self.layout.prop(self, 'scope')
+        for rule in modifier_stack_rules:
+            self.layout.prop(self, rule)
+
+    def execute(self, context):
+        if self.scope == 'SELECTED':
+            objs = context.selected_objects
+        elif self.scope == 'COLLECTION':
+            objs = context.collection.all_objects
+        else: objs = context.scene.objects
+
+        rules = [r for r in modifier_stack_rules if getattr(self, r)]
+        objs = [o for o in objs if hasattr(o, 'modifiers') and len(o.modifiers) > 1]
+
+        # Objects that already follow the rules are left untouched
+        num_changed = 0
+        failed = []
+        for obj in objs:
+            try:
+                if normalize_modifier_stack(obj, rules):
+                    num_changed += 1
+            except Exception as e:
+                print("INFO: Cannot normalize modifier stack of '" + obj.name + "': " + str(e))
+                failed.append(obj.name)
+
+        if failed:
+            self.report({'WARNING'}, "%d of %d modifier stacks changed, failed on: %s" % (num_changed, len(objs), ', '.join(failed)))
+        else: self.report({'INFO'}, "%d of %d modifier stacks changed" % (num_changed, len(objs)))
 
         return {'FINISHED'}
 
@@ -347,6 +1278,10 @@ class YToggleGPUSubdiv(bpy.types.Operator):
 
 class YPropertyCollectionModifierItem(bpy.types.PropertyGroup):
     checked: BoolProperty(name="", default=False)
+    changes_topology: BoolProperty(name="", default=False)
+
+def update_check_topology(self, context):
+    self.set_topology_changes(context.object)
 
 class YApplyModifiersWithShapeKeys(bpy.types.Operator):
     bl_idname = "mesh.y_apply_modifiers_with_shapekeys"
@@ -356,24 +1291,100 @@ class YApplyModifiersWithShapeKeys(bpy.types.Operator):
 
     my_collection: CollectionProperty(type=YPropertyCollectionModifierItem)
 
+    check_topology: BoolProperty(
+        name="Check Topology",
+        description="Check which modifiers will end up with different topology per shape key (can be slow on heavy modifiers)",
+        default=False,
+        update=update_check_topology,
+    )
+
     disable_armatures: BoolProperty(
         name="Don't include armature deformations",
         default=True,
     )
 
+    use_deform_fast_path: BoolProperty(
+        name="Use Deform Fast Path",
+        description="Evaluate deform only modifiers (armature, lattice, hook, etc) once and transform all shape keys with it",
+        default=True,
+    )
+
+    use_workers: BoolProperty(
+        name="Use Background Workers",
+        description="Evaluate shape keys in parallel using background Blender processes",
+        default=False,
+    )
+
+    num_workers: IntProperty(
+        name="Workers",
+        description="Number of background Blender processes",
+        default=max(min(os.cpu_count() or 2, 64), 2), min=2, max=64,
+    )
+
+    use_cache: BoolProperty(
+        name="Use Cache",
+        description="Reuse evaluated shape keys from previous apply if nothing has changed",
+        default=True,
+    )
+
+    use_legacy_method: BoolProperty(
+        name="Use Legacy Method",
+        description="Use the old operator based method which copies the object for every shape key (slower)",
+        default=False,
+    )
+
+    timing_log_path: StringProperty(
+        name="Timing Log",
+        description="Write timing of each stage into this JSON file (leave empty to skip)",
+        default='',
+        subtype='FILE_PATH',
+    )
+
     def invoke(self, context, event):
+        obj = context.object
         self.my_collection.clear()
-        for i in range(len(bpy.context.object.modifiers)):
+        for i in range(len(obj.modifiers)):
             item = self.my_collection.add()
-            item.name = bpy.context.object.modifiers[i].name
+            item.name = obj.modifiers[i].name
             item.checked = False
+            item.changes_topology = False
+
+        self.set_topology_changes(obj)
+
         return context.window_manager.invoke_props_dialog(self)
 
+    def set_topology_changes(self, obj):
+
+        # Check which modifiers will end up with different topology per shape key
+        changes = {}
+        if self.check_topology and obj.mode == 'OBJECT' and obj.data.shape_keys and len(obj.data.shape_keys.key_blocks) > 1:
+            changes = get_modifier_topology_changes(obj)
+
+        for item in self.my_collection:
+            item.changes_topology = changes.get(item.name, False)
+
     def draw(self, context):
         box = self.layout.box()
         for prop in self.my_collection:
-            box.prop(prop, "checked", text=prop["name"])
+            r = box.row()
+            r.alert = prop.changes_topology
+            r.prop(prop, "checked", text=prop["name"])
+            if prop.changes_topology:
+                r.label(text='', icon='ERROR')
+
+        offending = [prop.name for prop in self.my_collection if prop.checked and prop.changes_topology]
+        if offending:
+            self.layout.label(text="Topology changes per shape key: " + ', '.join(offending), icon='ERROR')
+
+        self.layout.prop(self, "check_topology")
         self.layout.prop(self, "disable_armatures")
+        self.layout.prop(self, "use_deform_fast_path")
+        self.layout.prop(self, "use_workers")
+        if self.use_workers:
+            self.layout.prop(self, "num_workers")
+        self.layout.prop(self, "use_cache")
+        self.layout.prop(self, "use_legacy_method")
+        self.layout.prop(self, "timing_log_path")
 
     def execute(self, context):
 
@@ -382,30 +1393,102 @@ class YApplyModifiersWithShapeKeys(bpy.types.Operator):
         if not selectedModifiers:
             self.report({'ERROR'}, 'No modifier selected!')
             return {'FINISHED'}
+
+        offending = [o.name for o in self.my_collection if o.checked and o.changes_topology]
+        if offending:
+            self.report({'ERROR'}, "Shape keys will end up with different topology after applying: " + ', '.join(offending))
+            return {'CANCELLED'}
         
-        success, errorInfo = apply_modifiers_with_shape_keys(context.object, selectedModifiers, self.disable_armatures)
+        stats = ApplyModifiersStats()
+        success, errorInfo = apply_modifiers_with_shape_keys(context.object, selectedModifiers, self.disable_armatures, self.use_legacy_method, self.use_deform_fast_path,
+                self.num_workers if self.use_workers else 0, self.use_cache, stats)
         
+        if self.timing_log_path != '':
+            try: stats.dump_json(bpy.path.abspath(self.timing_log_path))
+            except Exception as e: self.report({'WARNING'}, "Cannot write timing log: " + str(e))
+
         if not success:
             self.report({'ERROR'}, errorInfo)
+        else:
+            self.report({'INFO'}, stats.get_summary())
         
         return {'FINISHED'}
 
+class YClearShapeKeysCache(bpy.types.Operator):
+    bl_idname = "mesh.y_clear_shape_keys_cache"
+    bl_label = "Clear Shape Keys Cache"
+    bl_description = "Clear cached evaluated shape keys used by apply modifiers with shape keys"
+
+    def execute(self, context):
+        self.report({'INFO'}, "Cleared cache: " + shape_keys_eval_cache.get_summary())
+        shape_keys_eval_cache.clear()
+        return {'FINISHED'}
+
+@persistent
+def yetc_invalidate_mesh_caches(scene, depsgraph):
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry: continue
+        id = update.id.original
+
+        # Object geometry is also updated by deformation on every frame, only mesh data changes matter
+        if isinstance(id, bpy.types.Mesh):
+            invalidate_mesh_caches(id)
+        elif isinstance(id, bpy.types.Key) and isinstance(id.user, bpy.types.Mesh):
+            # Shape keys changes don't affect the topology
+            invalidate_mesh_caches(id.user, geometry=False)
+
+@persistent
+def yetc_clear_mesh_caches(*args):
+    clear_mesh_caches()
+
 def register():
     bpy.utils.register_class(YPropertyCollectionModifierItem)
     bpy.utils.register_class(YUnionMeshes)
     bpy.utils.register_class(YShapeKeyReset)
     bpy.utils.register_class(YApplyShapeKey)
+    bpy.utils.register_class(YPropertyCollectionCheckItem)
     bpy.utils.register_class(YShapeKeyToAttribute)
+    bpy.utils.register_class(YAttributeToShapeKey)
+    bpy.utils.register_class(YMirrorShapeKeys)
+    bpy.utils.register_class(YSplitShapeKeys)
+    bpy.utils.register_class(YCorrectiveShapeKey)
+    bpy.utils.register_class(YTransferShapeKeys)
+    bpy.utils.register_class(YExportShapeKeyArchive)
+    bpy.utils.register_class(YImportShapeKeyArchive)
+    bpy.utils.register_class(YExportQuantizedMorphs)
     bpy.utils.register_class(YMakeSubsurfLast)
+    bpy.utils.register_class(YNormalizeModifierStacks)
     bpy.utils.register_class(YToggleGPUSubdiv)
     bpy.utils.register_class(YApplyModifiersWithShapeKeys)
+    bpy.utils.register_class(YClearShapeKeysCache)
+
+    bpy.app.handlers.depsgraph_update_post.append(yetc_invalidate_mesh_caches)
+    bpy.app.handlers.undo_post.append(yetc_clear_mesh_caches)
+    bpy.app.handlers.redo_post.append(yetc_clear_mesh_caches)
+    bpy.app.handlers.load_post.append(yetc_clear_mesh_caches)
 
 def unregister():
     bpy.utils.unregister_class(YPropertyCollectionModifierItem)
     bpy.utils.unregister_class(YUnionMeshes)
     bpy.utils.unregister_class(YShapeKeyReset)
     bpy.utils.unregister_class(YApplyShapeKey)
+    bpy.utils.unregister_class(YPropertyCollectionCheckItem)
     bpy.utils.unregister_class(YShapeKeyToAttribute)
+    bpy.utils.unregister_class(YAttributeToShapeKey)
+    bpy.utils.unregister_class(YMirrorShapeKeys)
+    bpy.utils.unregister_class(YSplitShapeKeys)
+    bpy.utils.unregister_class(YCorrectiveShapeKey)
+    bpy.utils.unregister_class(YTransferShapeKeys)
+    bpy.utils.unregister_class(YExportShapeKeyArchive)
+    bpy.utils.unregister_class(YImportShapeKeyArchive)
+    bpy.utils.unregister_class(YExportQuantizedMorphs)
     bpy.utils.unregister_class(YMakeSubsurfLast)
+    bpy.utils.unregister_class(YNormalizeModifierStacks)
     bpy.utils.unregister_class(YToggleGPUSubdiv)
     bpy.utils.unregister_class(YApplyModifiersWithShapeKeys)
+    bpy.utils.unregister_class(YClearShapeKeysCache)
+
+    bpy.app.handlers.depsgraph_update_post.remove(yetc_invalidate_mesh_caches)
+    bpy.app.handlers.undo_post.remove(yetc_clear_mesh_caches)
+    bpy.app.handlers.redo_post.remove(yetc_clear_mesh_caches)
+    bpy.app.handlers.load_post.remove(yetc_clear_mesh_caches)
@@ -69,7 +69,7 @@ def get_outline_mat(col, bsdf_type):
     return mat
 
 def get_outline_modifier(obj):
-    m = [m for m in obj.modifiers if m.type == 'SOLIDIFY' and m.material_offset > 0 and m.use_flip_normals]
+    m = [m for m in obj.modifiers if is_outline_modifier(m)]
     if m: return m[0]
     return None
 
@@ -339,16 +339,71 @@ class YAddOutline(bpy.types.Operator):
 
         return {'FINISHED'}
 
+class YETCProfileResult(bpy.types.PropertyGroup):
+    object : StringProperty(default='')
+    modifier : StringProperty(default='')
+    kind : StringProperty(default='')
+    time_ms : FloatProperty(default=0.0)
+    verts : IntProperty(default=0)
+    memory_kb : FloatProperty(default=0.0)
+
 class YETCSceneProps(bpy.types.PropertyGroup):
     hide_outline_while_texture_paint : BoolProperty(
             name = 'Hide Outline while Texture Paint',
             description = 'Hide outline modifier while texture painting since it won\'t work with mirrored uv',
             default = False)
 
+    shape_key_cache_budget : IntProperty(
+            name = 'Shape Key Cache Budget',
+            description = 'Memory budget (in megabytes) to keep evaluated shape keys for repeated apply modifiers with shape keys, 0 to disable',
+            default = 256, min = 0, subtype = 'UNSIGNED')
+
+    use_adaptive_quality : BoolProperty(
+            name = 'Adaptive Viewport Quality',
+            description = 'Lower subdivision levels and hide heavy modifiers of the most costly objects when viewport is slower than target FPS',
+            default = False)
+
+    adaptive_quality_target_fps : IntProperty(
+            name = 'Target FPS',
+            description = 'Viewport quality will be lowered when viewport is slower than this',
+            default = 24, min = 1, max = 240)
+
+    adaptive_quality_headroom : FloatProperty(
+            name = 'Headroom',
+            description = 'How much faster than target FPS the viewport should be before the quality is restored',
+            default = 0.25, min = 0.0, max = 2.0, subtype = 'FACTOR')
+
+    adaptive_quality_step : IntProperty(
+            name = 'Objects per Step',
+            description = 'Number of objects changed each time the quality is lowered or restored',
+            default = 4, min = 1)
+
+    profile_results : CollectionProperty(type=YETCProfileResult)
+
+    profile_sort : EnumProperty(
+            name = 'Sort By',
+            description = 'Sort profile results by',
+            items = (('time_ms', 'Time', 'Evaluation time'),
+                     ('verts', 'Vertices', 'Evaluated vertex count'),
+                     ('memory_kb', 'Memory', 'Estimated evaluated mesh memory')),
+            default = 'time_ms')
+
+class YETCDegradedModifier(bpy.types.PropertyGroup):
+    name : StringProperty(default='')
+    kind : StringProperty(default='')
+    value : IntProperty(default=0)
+
 class YETCObjectProps(bpy.types.PropertyGroup):
     last_mode : StringProperty(default='')
     outline_mod_name : StringProperty(default='')
 
+    use_adaptive_quality : BoolProperty(
+            name = 'Allow Adaptive Quality',
+            description = 'Allow adaptive viewport quality to lower the quality of this object',
+            default = True)
+
+    degraded_mods : CollectionProperty(type=YETCDegradedModifier)
+
 @persistent
 def yetc_toggle_object_outline(scene):
     if not scene.yetc.hide_outline_while_texture_paint: return
@@ -461,7 +516,9 @@ def register():
     bpy.utils.register_class(YAddStrokeGenOutline)
     bpy.utils.register_class(YRemoveOutline)
     bpy.utils.register_class(YFixBlender420Outline)
+    bpy.utils.register_class(YETCProfileResult)
     bpy.utils.register_class(YETCSceneProps)
+    bpy.utils.register_class(YETCDegradedModifier)
     bpy.utils.register_class(YETCObjectProps)
 
     bpy.types.Scene.yetc = PointerProperty(type=YETCSceneProps)
@@ -474,7 +531,9 @@ def unregister():
     bpy.utils.unregister_class(YAddStrokeGenOutline)
     bpy.utils.unregister_class(YRemoveOutline)
     bpy.utils.unregister_class(YFixBlender420Outline)
+    bpy.utils.unregister_class(YETCProfileResult)
     bpy.utils.unregister_class(YETCSceneProps)
+    bpy.utils.unregister_class(YETCDegradedModifier)
     bpy.utils.unregister_class(YETCObjectProps)
 
     bpy.app.handlers.depsgraph_update_post.remove(yetc_toggle_object_outline)
@@ -97,27 +97,25 @@ def get_all_objects_using_rig_with_datas(rig):
 
     return objs, armods, ori_mod_props, ori_mod_idx, child_objs, parent_bones
 
-def apply_armatures(context, objs, child_objs, armature_modifier_names, apply_above=True):
-
-    #armature_ids = []
+def get_failed_objects(items, results):
+    failed_objs = []
+    for i, (success, errorInfo) in enumerate(results):
+        o = items[i][0]
+        if not success and o.name not in failed_objs:
+            failed_objs.append(o.name)
 
-    for i, o in enumerate(objs):
-        #print(o, armature_modifier_names[i])
+    return failed_objs
 
-        # Apply shapekeys
-        #if o.data.shape_keys:
-        #    for sk in o.data.shape_keys.key_blocks:
-        #        o.shape_key_remove(sk)
+def apply_armatures(context, objs, child_objs, armature_modifier_names, apply_above=True):
 
-        # If object is multi user, make it single user
-        if o.data.users > 1:
-            o.data = o.data.copy()
+    #armature_ids = []
 
-        # Set object to active
-        context.view_layer.objects.active = o
+    # Collect modifiers to apply for all objects, so they can be applied in one batch
+    items = []
 
-        # Check for other modifiers
-        if apply_above:
+    # Check for other modifiers
+    if apply_above:
+        for i, o in enumerate(objs):
             to_be_applied = []
             for mod in o.modifiers:
                 if mod.name == armature_modifier_names[i]:
@@ -125,18 +123,15 @@ def apply_armatures(context, objs, child_objs, armature_modifier_names, apply_ab
                 if mod.type not in {'SUBSURF'}:
                     to_be_applied.append(mod.name)
 
-            apply_modifiers_with_shape_keys(o, to_be_applied)
-            #for mod in to_be_applied:
-            #    try: bpy.ops.object.modifier_apply(modifier=mod)
-            #    except Exception as e: pass
+            items.append((o, to_be_applied))
 
-    # Apply armature modifier
+    # Apply armature modifier, other armatures still deform the shape keys
     for i, o in enumerate(objs):
-        context.view_layer.objects.active = o
-        #armature_ids.append([j for j, m in enumerate(o.modifiers) if m.name == armature_modifier_names[i]][0])
-        #try: bpy.ops.object.modifier_apply(modifier=armature_modifier_names[i])
-        #except Exception as e: pass
-        apply_modifiers_with_shape_keys(o, [armature_modifier_names[i]], False)
+        items.append((o, [armature_modifier_names[i]], False))
+
+    # Multi user objects will be made single user
+    results = apply_modifiers_with_shape_keys_batch(items)
+    failed_objs = get_failed_objects(items, results)
 
     # Apply child of bones
     #bpy.ops.object.mode_set(mode='OBJECT')
@@ -147,6 +142,7 @@ def apply_armatures(context, objs, child_objs, armature_modifier_names, apply_ab
     bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
 
     #return armature_ids
+    return failed_objs
 
 def set_armature_back(context, rig, objs, child_objs, ori_mod_props, parent_bones, ori_mod_ids=[], back_to_rigify=False):
 
@@ -305,7 +301,9 @@ class YAppyRigifyToMetarig(bpy.types.Operator):
         objs, armods, ori_mod_props, ori_mod_idx, child_objs, parent_bones = get_all_objects_using_rig_with_datas(rigify)
 
         # Apply armature and modifiers above
-        apply_armatures(context, objs, child_objs, armods, apply_above=self.apply_above)
+        failed_objs = apply_armatures(context, objs, child_objs, armods, apply_above=self.apply_above)
+        if failed_objs:
+            self.report({'WARNING'}, "Failed to apply modifiers on: " + ', '.join(failed_objs))
 
         context.view_layer.objects.active = metarig
 
@@ -420,7 +418,9 @@ class YApplyRigifyDeform(bpy.types.Operator):
             #return {'FINISHED'}
 
             # Apply armature and modifiers above
-            apply_armatures(context, objs, child_objs, armods)
+            failed_objs = apply_armatures(context, objs, child_objs, armods)
+            if failed_objs:
+                self.report({'WARNING'}, "Failed to apply modifiers on: " + ', '.join(failed_objs))
 
             # Apply armature deform
             context.view_layer.objects.active = ori
@@ -453,7 +453,9 @@ class YApplyRigifyDeform(bpy.types.Operator):
             objs, armods, ori_mod_props, ori_mod_idx, child_objs, parent_bones = get_all_objects_using_rig_with_datas(ori)
 
             # Apply again
-            apply_armatures(context, objs, child_objs, armods)
+            failed_objs = apply_armatures(context, objs, child_objs, armods)
+            if failed_objs:
+                self.report({'WARNING'}, "Failed to apply modifiers on: " + ', '.join(failed_objs))
 
             #return {'FINISHED'}
 
@@ -485,7 +487,9 @@ class YApplyRigifyDeform(bpy.types.Operator):
         objs, armods, ori_mod_props, ori_mod_idx, child_objs, parent_bones = get_all_objects_using_rig_with_datas(ori)
 
         # Apply armature and modifiers above
-        apply_armatures(context, objs, child_objs, armods)
+        failed_objs = apply_armatures(context, objs, child_objs, armods)
+        if failed_objs:
+            self.report({'WARNING'}, "Failed to apply modifiers on: " + ', '.join(failed_objs))
         #return {'FINISHED'}
 
         # Copy rig object
@@ -874,15 +878,9 @@ class YApplyArmature(bpy.types.Operator):
                 parent_bones.append(o.parent_bone)
 
         # Apply armature and modifiers above
+        items = []
         for i, o in enumerate(objs):
 
-            # If object is multi user, make it single user
-            if o.data.users > 1:
-                o.data = o.data.copy()
-
-            # Set object to active
-            context.view_layer.objects.active = o
-
             # Check for mirror modifiers
             to_be_applied = []
             if self.apply_above:
@@ -890,16 +888,19 @@ class YApplyArmature(bpy.types.Operator):
                     if mod.name == armods[i]:
                         break
                     if mod.type not in {'SUBSURF'}:
-                        #bpy.ops.object.modifier_apply(modifier=mod.name)
                         to_be_applied.append(mod.name)
 
-            #for mod in to_be_applied:
-            #    bpy.ops.object.modifier_apply(modifier=mod.name)
-            apply_modifiers_with_shape_keys(o, to_be_applied)
+            items.append((o, to_be_applied))
+
+            # Apply armature modifier, other armatures still deform the shape keys
+            items.append((o, [armods[i]], False))
+
+        # Multi user objects will be made single user
+        results = apply_modifiers_with_shape_keys_batch(items)
 
-            # Apply armature modifier
-            #bpy.ops.object.modifier_apply(modifier=armods[i])
-            apply_modifiers_with_shape_keys(o, [armods[i]], False)
+        failed_objs = get_failed_objects(items, results)
+        if failed_objs:
+            self.report({'WARNING'}, "Failed to apply modifiers on: " + ', '.join(failed_objs))
 
         # Apply child of bones
         for o in child_objs:
@@ -1016,7 +1017,7 @@ class YLoopKeyframes(bpy.types.Operator):
                 return {'CANCELLED'}
 
             objects = [obj]
-        elif context.area.type == 'DOPESHEET_EDITOR' and context.space_data.ui_mode != 'DOPESHEET':
+        elif context.area and context.area.type == 'DOPESHEET_EDITOR' and context.space_data.ui_mode != 'DOPESHEET':
             objects = [obj]
         else:
             objects = context.view_layer.objects
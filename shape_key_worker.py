@@ -0,0 +1,54 @@
+# Background worker to evaluate a slice of shape keys through modifiers
+# Run by apply_modifiers_with_shape_keys, not by the addon itself:
+# blender -b --factory-startup --python shape_key_worker.py -- --blend file.blend --object name ...
+
+import bpy, sys, os, json, argparse
+import numpy as np
+
+# Common module only depends on bpy, so it can be imported without the addon
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common
+
+def main():
+    argv = sys.argv[sys.argv.index('--')+1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--blend', required=True)
+    parser.add_argument('--object', required=True)
+    parser.add_argument('--modifiers', required=True)
+    parser.add_argument('--indices', required=True)
+    parser.add_argument('--frame', type=int, default=1)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args(argv)
+
+    selectedModifiers = json.loads(args.modifiers)
+    indices = [int(i) for i in args.indices.split(',')]
+
+    # Start from empty scene so appended names won't clash
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+
+    with bpy.data.libraries.load(args.blend, link=False) as (data_from, data_to):
+        data_to.objects = [args.object]
+
+    obj = data_to.objects[0]
+    if not obj:
+        print('shape_key_worker: Object', args.object, 'is not found!')
+        sys.exit(1)
+
+    # Link all appended objects so modifier dependencies are evaluated too
+    for o in bpy.data.objects:
+        if not o.users_collection:
+            scene.collection.objects.link(o)
+
+    scene.frame_set(args.frame)
+    bpy.context.view_layer.objects.active = obj
+
+    coords, errorInfo = common.get_shape_keys_evaluated_coords(obj, selectedModifiers, indices)
+    if errorInfo:
+        print('shape_key_worker:', errorInfo)
+        sys.exit(1)
+
+    np.save(args.output, coords)
+
+main()
@@ -1,5 +1,6 @@
 import bpy
 from .common import *
+from .viewport_tools import get_sorted_profile_results, profile_offender_kinds, adaptive_quality_state
 
 class UCUPTOOLS_PT_pose_helper(bpy.types.Panel):
     bl_label = "Pose Helper"
@@ -101,6 +102,12 @@ class UCUPTOOLS_PT_advanced(bpy.types.Panel):
         c.operator('object.y_apply_rigify_to_metarig', icon='ARMATURE_DATA', text='Apply Rigify to Metarig')
         c.operator('object.y_apply_rigiy_deform', icon='ARMATURE_DATA', text='Apply Rigify Deform')
 
+        c.separator()
+
+        c.prop(context.scene.yetc, 'shape_key_cache_budget', text='Shape Key Cache (MB)')
+        c.label(text='Cache: ' + shape_keys_eval_cache.get_summary())
+        c.operator('mesh.y_clear_shape_keys_cache', icon='TRASH', text='Clear Shape Keys Cache')
+
 class UCUPTOOLS_PT_keyframes(bpy.types.Panel):
     bl_label = "Keyframes"
     bl_space_type = "DOPESHEET_EDITOR"
@@ -134,6 +141,14 @@ class UCUPTOOLS_PT_mesh_tools(bpy.types.Panel):
         c.operator('mesh.y_apply_shape_key', icon='SHAPEKEY_DATA', text='Shape Key Apply to Basis')
         c.operator('mesh.y_apply_modifiers_with_shapekeys', icon='SHAPEKEY_DATA', text='Apply Modifiers with Shape Keys')
         c.operator('mesh.y_shape_key_to_attribute', icon='SHAPEKEY_DATA', text='Convert Shape Key to Attribute')
+        c.operator('mesh.y_attribute_to_shape_key', icon='SHAPEKEY_DATA', text='Convert Attribute to Shape Key')
+        c.operator('mesh.y_mirror_shape_keys', icon='MOD_MIRROR', text='Mirror Shape Keys')
+        c.operator('mesh.y_split_shape_keys', icon='SHAPEKEY_DATA', text='Split Shape Keys')
+        c.operator('mesh.y_corrective_shape_key', icon='SHAPEKEY_DATA', text='Corrective Shape Key from Sculpt')
+        c.operator('mesh.y_transfer_shape_keys', icon='SHAPEKEY_DATA', text='Transfer Shape Keys')
+        c.operator('mesh.y_export_shape_key_archive', icon='EXPORT', text='Export Shape Key Archive')
+        c.operator('mesh.y_import_shape_key_archive', icon='IMPORT', text='Import Shape Key Archive')
+        c.operator('mesh.y_export_quantized_morphs', icon='EXPORT', text='Export Quantized Morphs')
         #c.separator()
         #c.operator('mesh.y_remove_unused_vertex_groups', icon='MESH_DATA', text='Remove Unused Vertex Groups')
 
@@ -149,15 +164,82 @@ class UCUPTOOLS_PT_subdiv_tools(bpy.types.Panel):
         if not is_bl_newer_than(4, 1):
             label += ' & Disable Autosmooth'
         c.operator('mesh.y_make_subsurf_last', icon='MOD_SUBSURF', text=label)
+        c.operator('object.y_normalize_modifier_stacks', icon='MODIFIER', text='Normalize Modifier Stacks')
         c.alert = bpy.app.version >= (3, 1, 0) and context.preferences.system.use_gpu_subdivision
         c.operator('view3d.y_toggle_gpu_subdiv', icon='MOD_SUBSURF', text='Toggle GPU Subdiv')
         c.alert = False
 
+        c.separator()
+
+        yetc = context.scene.yetc
+        c.prop(yetc, 'use_adaptive_quality')
+        if yetc.use_adaptive_quality:
+            cc = c.column(align=True)
+            cc.prop(yetc, 'adaptive_quality_target_fps')
+            cc.prop(yetc, 'adaptive_quality_headroom')
+            cc.prop(yetc, 'adaptive_quality_step')
+        if context.object:
+            c.prop(context.object.yetc, 'use_adaptive_quality')
+
+            # Show what adaptive quality changed on active object, with original values
+            degraded_mods = context.object.yetc.degraded_mods
+            if len(degraded_mods) > 0:
+                box = c.box()
+                box.alert = True
+                for d in degraded_mods:
+                    if d.kind == 'LEVELS':
+                        box.label(text=d.name + ': levels lowered from ' + str(d.value), icon='MOD_SUBSURF')
+                    else: box.label(text=d.name + ': hidden on viewport', icon='HIDE_ON')
+
+        num_degraded = len(adaptive_quality_state['degraded'])
+        if num_degraded > 0:
+            c.label(text='Quality lowered on %d object(s)' % num_degraded, icon='ERROR')
+        c.operator('view3d.y_restore_viewport_quality', icon='LOOP_BACK', text='Restore Viewport Quality')
+
+class UCUPTOOLS_PT_profiler(bpy.types.Panel):
+    bl_label = "Evaluation Profiler"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Ucup Etc"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        yetc = context.scene.yetc
+        c = self.layout.column()
+        c.operator('object.y_profile_evaluation_cost', icon='TIME', text='Profile Evaluation Cost')
+
+        if len(yetc.profile_results) == 0: return
+
+        c.prop(yetc, 'profile_sort')
+
+        c.label(text='Objects:')
+        col = c.box().column(align=True)
+        for r in get_sorted_profile_results(context.scene):
+            draw_profile_result(col, r, r.object)
+
+        for kind, label in profile_offender_kinds:
+            results = get_sorted_profile_results(context.scene, kind, 3)
+            if not results: continue
+            c.label(text=label + ':')
+            col = c.box().column(align=True)
+            for r in results:
+                draw_profile_result(col, r, r.object + ' > ' + r.modifier)
+
+        c.operator('object.y_export_profile_results', icon='EXPORT', text='Export Results')
+
+def draw_profile_result(layout, r, text):
+    row = layout.row(align=True)
+    row.label(text=text)
+    row.label(text='{:0.2f} ms'.format(r.time_ms))
+    row.label(text='{:,} v'.format(r.verts))
+    row.label(text='{:0.0f} KB'.format(r.memory_kb))
+
 def register():
     bpy.utils.register_class(UCUPTOOLS_PT_pose_helper)
     bpy.utils.register_class(UCUPTOOLS_PT_mirror_tools)
     bpy.utils.register_class(UCUPTOOLS_PT_mesh_tools)
     bpy.utils.register_class(UCUPTOOLS_PT_subdiv_tools)
+    bpy.utils.register_class(UCUPTOOLS_PT_profiler)
     bpy.utils.register_class(UCUPTOOLS_PT_vg_tools)
     bpy.utils.register_class(UCUPTOOLS_PT_item_tools)
     bpy.utils.register_class(UCUPTOOLS_PT_outline_tools)
@@ -170,6 +252,7 @@ def unregister():
     bpy.utils.unregister_class(UCUPTOOLS_PT_mirror_tools)
     bpy.utils.unregister_class(UCUPTOOLS_PT_mesh_tools)
     bpy.utils.unregister_class(UCUPTOOLS_PT_subdiv_tools)
+    bpy.utils.unregister_class(UCUPTOOLS_PT_profiler)
     bpy.utils.unregister_class(UCUPTOOLS_PT_vg_tools)
     bpy.utils.unregister_class(UCUPTOOLS_PT_item_tools)
     bpy.utils.unregister_class(UCUPTOOLS_PT_outline_tools)
@@ -0,0 +1,456 @@
+import bpy, time, json, csv
+from bpy.props import *
+from bpy.app.handlers import persistent
+from bpy_extras.io_utils import ExportHelper
+from .common import *
+
+# Generative and cosmetic modifiers that can be hidden on viewport without breaking the pose
+heavy_modifier_types = {'BOOLEAN', 'REMESH', 'BEVEL', 'SOLIDIFY', 'WELD', 'SKIN'}
+
+# Number of timer ticks in a row before changing quality, restoring is slower to avoid flickering
+adaptive_quality_degrade_ticks = 2
+adaptive_quality_restore_ticks = 6
+adaptive_quality_interval = 0.5
+
+# Longer gap between redraws means viewport is idle rather than slow
+adaptive_quality_idle_time = 2.0
+
+adaptive_quality_state = {
+        'last_draw' : {},
+        'last_frame' : 0.0,
+        'samples' : [],
+        'slow_ticks' : 0,
+        'fast_ticks' : 0,
+        'degraded' : set(),
+        }
+
+def get_viewport_cost(obj):
+    levels = 0
+    num_heavy = 0
+    for m in obj.modifiers:
+        if not m.show_viewport: continue
+        if m.type in {'SUBSURF', 'MULTIRES'}: 
+            levels += m.levels
+        elif m.type in heavy_modifier_types:
+            num_heavy += 1
+
+    return len(obj.data.vertices) * (4 ** levels) * (1 + num_heavy)
+
+def record_degraded_modifier(obj, mod, kind, value):
+    for d in obj.yetc.degraded_mods:
+        if d.name == mod.name and d.kind == kind: return
+
+    d = obj.yetc.degraded_mods.add()
+    d.name = mod.name
+    d.kind = kind
+    d.value = value
+
+def degrade_object_quality(obj):
+
+    # Lower subdivision first, then hide outline, then hide other heavy modifiers
+    mods = [m for m in obj.modifiers if m.type in {'SUBSURF', 'MULTIRES'} and m.show_viewport and m.levels > 0]
+    if mods:
+        for m in mods:
+            record_degraded_modifier(obj, m, 'LEVELS', m.levels)
+            m.levels -= 1
+        return True
+
+    for kind, check in (
+            ('OUTLINE', is_outline_modifier), 
+            ('HEAVY', lambda m: m.type in heavy_modifier_types and not is_outline_modifier(m))
+            ):
+        mods = [m for m in obj.modifiers if m.show_viewport and check(m)]
+        if mods:
+            for m in mods:
+                record_degraded_modifier(obj, m, kind, 1)
+                m.show_viewport = False
+            return True
+
+    return False
+
+def restore_object_quality(obj, full=False):
+    items = obj.yetc.degraded_mods
+
+    # Restore in reverse order of degrading
+    for kind in ('HEAVY', 'OUTLINE', 'LEVELS'):
+        ids = [i for i, d in enumerate(items) if d.kind == kind]
+        if not ids: continue
+
+        for i in reversed(ids):
+            d = items[i]
+            m = obj.modifiers.get(d.name)
+            if m and kind == 'LEVELS':
+                m.levels = d.value if full else min(m.levels + 1, d.value)
+                if m.levels < d.value: continue
+            elif m: m.show_viewport = True
+            items.remove(i)
+
+        if not full: break
+
+    return len(items) == 0
+
+def degrade_viewport_quality(scene):
+    degraded = adaptive_quality_state['degraded']
+
+    objs = [o for o in scene.objects if o.type == 'MESH' and o.yetc.use_adaptive_quality and o.visible_get()]
+    objs.sort(key=get_viewport_cost, reverse=True)
+
+    num = 0
+    for obj in objs:
+        if degrade_object_quality(obj):
+            degraded.add(obj.name)
+            num += 1
+            if num >= scene.yetc.adaptive_quality_step: break
+
+    return num
+
+def restore_viewport_quality(scene, full=False):
+    degraded = adaptive_quality_state['degraded']
+
+    objs = []
+    for name in list(degraded):
+        obj = bpy.data.objects.get(name)
+        if obj: objs.append(obj)
+        else: degraded.discard(name)
+
+    # Cheapest objects get their quality back first
+    objs.sort(key=get_viewport_cost)
+    if not full: objs = objs[:scene.yetc.adaptive_quality_step]
+
+    for obj in objs:
+        if restore_object_quality(obj, full):
+            degraded.discard(obj.name)
+
+    return len(objs)
+
+def adaptive_quality_timer():
+    state = adaptive_quality_state
+    scene = bpy.context.scene
+
+    if not scene or not scene.yetc.use_adaptive_quality:
+        if state['degraded']: restore_viewport_quality(scene, full=True)
+        state['samples'] = []
+        return 1.0
+
+    samples = state['samples']
+    state['samples'] = []
+
+    # Viewport isn't redrawing so there's nothing to measure
+    if len(samples) < 3:
+        state['slow_ticks'] = state['fast_ticks'] = 0
+        return adaptive_quality_interval
+
+    samples.sort()
+    fps = 1.0 / max(samples[len(samples) // 2], 1e-6)
+    target = scene.yetc.adaptive_quality_target_fps
+
+    if fps < target:
+        state['slow_ticks'] += 1
+        state['fast_ticks'] = 0
+    elif fps > target * (1.0 + scene.yetc.adaptive_quality_headroom) and state['degraded']:
+        state['fast_ticks'] += 1
+        state['slow_ticks'] = 0
+    else:
+        state['slow_ticks'] = state['fast_ticks'] = 0
+
+    num = 0
+    if state['slow_ticks'] >= adaptive_quality_degrade_ticks:
+        num = degrade_viewport_quality(scene)
+        state['slow_ticks'] = 0
+        if num: print("INFO: Adaptive quality lowered the quality of %d object(s) at %0.1f FPS" % (num, fps))
+    elif state['fast_ticks'] >= adaptive_quality_restore_ticks:
+        num = restore_viewport_quality(scene)
+        state['fast_ticks'] = 0
+        if num: print("INFO: Adaptive quality restored the quality of %d object(s) at %0.1f FPS" % (num, fps))
+
+    # Changes are done outside of operators, so panels need to show them
+    if num: redraw_ui_regions()
+
+    return adaptive_quality_interval
+
+def redraw_ui_regions():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                for region in area.regions:
+                    if region.type == 'UI': region.tag_redraw()
+
+def add_frame_time_sample(frame_time):
+    if frame_time > adaptive_quality_idle_time: return
+
+    samples = adaptive_quality_state['samples']
+    samples.append(frame_time)
+    if len(samples) > 240:
+        del samples[:-120]
+
+def adaptive_quality_draw_post():
+    scene = bpy.context.scene
+    if not scene or not scene.yetc.use_adaptive_quality: return
+
+    # Frame time is the wall clock time between successive redraws of the same viewport
+    area = bpy.context.area
+    key = area.as_pointer() if area else 0
+    now = time.perf_counter()
+    last = adaptive_quality_state['last_draw'].get(key)
+    adaptive_quality_state['last_draw'][key] = now
+    if last: add_frame_time_sample(now - last)
+
+@persistent
+def yetc_adaptive_quality_frame_post(scene, depsgraph=None):
+    state = adaptive_quality_state
+    if not scene.yetc.use_adaptive_quality: return
+
+    # Playback can skip redraws, so time between frame changes is also measured
+    now = time.perf_counter()
+    if state['last_frame']: add_frame_time_sample(now - state['last_frame'])
+    state['last_frame'] = now
+
+def sync_degraded_objects():
+    # Degraded modifiers are stored on objects, so they can still be restored after reload or undo
+    degraded = adaptive_quality_state['degraded']
+    degraded.clear()
+    for obj in bpy.data.objects:
+        if len(obj.yetc.degraded_mods) > 0:
+            degraded.add(obj.name)
+
+@persistent
+def yetc_adaptive_quality_undo_post(scene, depsgraph=None):
+    sync_degraded_objects()
+
+@persistent
+def yetc_adaptive_quality_load_post(dummy):
+    sync_degraded_objects()
+
+    adaptive_quality_state['samples'] = []
+    adaptive_quality_state['last_draw'].clear()
+    adaptive_quality_state['last_frame'] = 0.0
+
+class YRestoreViewportQuality(bpy.types.Operator):
+    bl_idname = "view3d.y_restore_viewport_quality"
+    bl_label = "Restore Viewport Quality"
+    bl_description = "Restore all modifiers lowered by adaptive viewport quality"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return True
+
+    def execute(self, context):
+        num = 0
+        for obj in bpy.data.objects:
+            if hasattr(obj, 'yetc') and len(obj.yetc.degraded_mods) > 0:
+                restore_object_quality(obj, full=True)
+                num += 1
+
+        adaptive_quality_state['degraded'].clear()
+        self.report({'INFO'}, "Viewport quality of %d object(s) are restored" % num)
+
+        return {'FINISHED'}
+
+# Modifier kinds listed as worst offenders on profiler panel
+profile_offender_kinds = [
+        ('SUBSURF', 'Subsurf'),
+        ('OUTLINE', 'Outline'),
+        ('BOOLEAN', 'Boolean'),
+        ('MULTIRES', 'Multires'),
+        ]
+
+profile_columns = ['object', 'modifier', 'kind', 'time_ms', 'verts', 'memory_kb']
+
+def get_modifier_kind(mod):
+    if is_outline_modifier(mod): return 'OUTLINE'
+    return mod.type
+
+def get_evaluated_mesh_stats(obj, depsgraph):
+    mesh = obj.evaluated_get(depsgraph).data
+    if not mesh: return 0, 0.0
+
+    # Rough estimate: positions, edge pairs, loop verts & edges, face offsets, and loop normals
+    memory = len(mesh.vertices) * 12 + len(mesh.edges) * 8 + len(mesh.loops) * 20 + len(mesh.polygons) * 4
+
+    return len(mesh.vertices), memory / 1024.0
+
+def time_object_evaluation(obj, depsgraph, repeat):
+    best = None
+    for i in range(repeat):
+        obj.update_tag(refresh={'DATA'})
+        t0 = time.perf_counter()
+        depsgraph.update()
+        t = time.perf_counter() - t0
+        if best == None or t < best: best = t
+
+    return best * 1000.0
+
+def profile_object_evaluation(obj, depsgraph, repeat=3):
+    total = time_object_evaluation(obj, depsgraph, repeat)
+    verts, memory = get_evaluated_mesh_stats(obj, depsgraph)
+    rows = [(obj.name, '', 'OBJECT', total, verts, memory)]
+
+    # Cost of a modifier is the difference when it's disabled
+    for m in obj.modifiers:
+        if not m.show_viewport: continue
+        m.show_viewport = False
+        try:
+            t = time_object_evaluation(obj, depsgraph, repeat)
+            v, mem = get_evaluated_mesh_stats(obj, depsgraph)
+        finally: m.show_viewport = True
+        rows.append((obj.name, m.name, get_modifier_kind(m), max(total - t, 0.0), verts - v, memory - mem))
+
+    obj.update_tag(refresh={'DATA'})
+    depsgraph.update()
+
+    return rows
+
+# Sorted indices of profile results for each sort column and kind, so the panel won't sort on every redraw
+profile_result_order = {}
+
+def sort_profile_results(scene):
+    results = scene.yetc.profile_results
+    profile_result_order.clear()
+    profile_result_order['signature'] = (scene.as_pointer(), len(results))
+
+    groups = {}
+    for i, r in enumerate(results):
+        groups.setdefault(r.kind, []).append((i, r.time_ms, r.verts, r.memory_kb))
+
+    for column, attr in enumerate(('time_ms', 'verts', 'memory_kb')):
+        for kind, rows in groups.items():
+            rows.sort(key=lambda row: row[column + 1], reverse=True)
+            profile_result_order[(attr, kind)] = [row[0] for row in rows]
+
+@persistent
+def yetc_clear_profile_result_order(scene, depsgraph=None):
+    # Results can be changed by undo or loading other file without running the profiler
+    profile_result_order.clear()
+
+def get_sorted_profile_results(scene, kind='OBJECT', limit=10):
+    results = scene.yetc.profile_results
+
+    # Results are sorted again only after the cached order is cleared
+    if profile_result_order.get('signature') != (scene.as_pointer(), len(results)):
+        sort_profile_results(scene)
+
+    ids = profile_result_order.get((scene.yetc.profile_sort, kind), [])
+    return [results[i] for i in ids[:limit]]
+
+class YProfileEvaluationCost(bpy.types.Operator):
+    bl_idname = "object.y_profile_evaluation_cost"
+    bl_label = "Profile Evaluation Cost"
+    bl_description = "Measure evaluation time, vertex count, and memory of objects and each of their modifiers"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    scope : EnumProperty(
+            name = 'Scope',
+            description = 'Objects to profile',
+            items = (('SELECTED', 'Selected Objects', ''),
+                     ('VISIBLE', 'Visible Objects', '')),
+            default = 'VISIBLE')
+
+    repeat : IntProperty(
+            name = 'Repeat',
+            description = 'Number of evaluations for each measurement, the fastest one is used',
+            default = 3, min = 1, max = 20)
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT'
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        depsgraph = context.evaluated_depsgraph_get()
+
+        if self.scope == 'SELECTED':
+            objs = context.selected_objects
+        else: objs = context.visible_objects
+        objs = [o for o in objs if o.type == 'MESH']
+
+        T = time.time()
+
+        rows = []
+        for obj in objs:
+            rows.extend(profile_object_evaluation(obj, depsgraph, self.repeat))
+
+        results = scene.yetc.profile_results
+        results.clear()
+        for row in rows:
+            r = results.add()
+            r.object, r.modifier, r.kind, r.time_ms, r.verts, r.memory_kb = row
+        sort_profile_results(scene)
+
+        self.report({'INFO'}, str(len(objs)) + " object(s) are profiled in " + '{:0.2f}'.format(time.time() - T) + ' seconds!')
+
+        return {'FINISHED'}
+
+class YExportProfileResults(bpy.types.Operator, ExportHelper):
+    bl_idname = "object.y_export_profile_results"
+    bl_label = "Export Profile Results"
+    bl_description = "Export evaluation cost profile results as CSV or JSON (based on file extension)"
+
+    filename_ext = '.csv'
+    check_extension = False
+    filter_glob : StringProperty(default='*.csv;*.json', options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        return len(context.scene.yetc.profile_results) > 0
+
+    def execute(self, context):
+        rows = [[getattr(r, c) for c in profile_columns] for r in context.scene.yetc.profile_results]
+
+        try:
+            with open(self.filepath, 'w', newline='') as f:
+                if self.filepath.lower().endswith('.json'):
+                    json.dump([dict(zip(profile_columns, row)) for row in rows], f, indent=2)
+                else:
+                    writer = csv.writer(f)
+                    writer.writerow(profile_columns)
+                    writer.writerows(rows)
+        except Exception as e:
+            self.report({'ERROR'}, "Cannot write profile results: " + str(e))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, str(len(rows)) + " rows are exported to '" + self.filepath + "'")
+
+        return {'FINISHED'}
+
+draw_handlers = []
+
+def register():
+    bpy.utils.register_class(YRestoreViewportQuality)
+    bpy.utils.register_class(YProfileEvaluationCost)
+    bpy.utils.register_class(YExportProfileResults)
+
+    draw_handlers.append(bpy.types.SpaceView3D.draw_handler_add(adaptive_quality_draw_post, (), 'WINDOW', 'POST_PIXEL'))
+
+    bpy.app.handlers.frame_change_post.append(yetc_adaptive_quality_frame_post)
+    bpy.app.handlers.load_post.append(yetc_adaptive_quality_load_post)
+    bpy.app.handlers.undo_post.append(yetc_adaptive_quality_undo_post)
+    bpy.app.handlers.redo_post.append(yetc_adaptive_quality_undo_post)
+    bpy.app.handlers.load_post.append(yetc_clear_profile_result_order)
+    bpy.app.handlers.undo_post.append(yetc_clear_profile_result_order)
+    bpy.app.handlers.redo_post.append(yetc_clear_profile_result_order)
+
+    bpy.app.timers.register(adaptive_quality_timer, first_interval=1.0, persistent=True)
+
+def unregister():
+    bpy.utils.unregister_class(YRestoreViewportQuality)
+    bpy.utils.unregister_class(YProfileEvaluationCost)
+    bpy.utils.unregister_class(YExportProfileResults)
+
+    for handler in draw_handlers:
+        bpy.types.SpaceView3D.draw_handler_remove(handler, 'WINDOW')
+    draw_handlers.clear()
+
+    bpy.app.handlers.frame_change_post.remove(yetc_adaptive_quality_frame_post)
+    bpy.app.handlers.load_post.remove(yetc_adaptive_quality_load_post)
+    bpy.app.handlers.undo_post.remove(yetc_adaptive_quality_undo_post)
+    bpy.app.handlers.redo_post.remove(yetc_adaptive_quality_undo_post)
+    bpy.app.handlers.load_post.remove(yetc_clear_profile_result_order)
+    bpy.app.handlers.undo_post.remove(yetc_clear_profile_result_order)
+    bpy.app.handlers.redo_post.remove(yetc_clear_profile_result_order)
+
+    if bpy.app.timers.is_registered(adaptive_quality_timer):
+        bpy.app.timers.unregister(adaptive_quality_timer)